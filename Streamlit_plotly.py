@@ -1,7 +1,45 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
+from plotly.colors import qualitative
 import pandas as pd
+from ohlcv_store import OHLCVStore
+from history_cache import HistoryCache, store_fetch
+from ohlcv_pyramid import OHLCVPyramid, RESOLUTIONS
+from downsample import downsample_line, downsample_ohlc
+from fundamentals import FundamentalsCache, historical_market_cap
+from market_data import get_provider
+from concurrent_fetch import fetch_concurrently
+
+# Shared on-disk OHLCV store: only bars newer than the last stored date are downloaded
+@st.cache_resource
+def get_ohlcv_store():
+    return OHLCVStore()
+
+# In-memory history cache in front of the store, shared by all sessions
+@st.cache_resource
+def get_history_cache():
+    return HistoryCache(fetch=store_fetch(get_ohlcv_store()))
+
+history_cache = get_history_cache()
+
+# Share count and split history per ticker, kept on disk and refreshed daily
+@st.cache_resource
+def get_fundamentals_cache():
+    return FundamentalsCache()
+
+# Per-ticker day/week/month/quarter/year bars, built once and shared by all sessions
+@st.cache_resource(max_entries=64)
+def get_pyramid(ticker):
+    return OHLCVPyramid()
+
+# One network request per (ticker, kind); these run on worker threads and must not call Streamlit
+def fetch_ticker_data(key):
+    ticker, kind = key
+    if kind == 'history':
+        return history_cache.get(ticker, period='max')
+    if kind == 'news':
+        return get_provider().news(ticker)
+    return get_fundamentals_cache().load(ticker)
 
 # Set up the Streamlit app
 st.title('Stock Price and Market Capitalization Viewer')
@@ -12,38 +50,23 @@ tickers = st.text_input('Enter Comma-Separated Stock Ticker Symbols', 'AAPL, MSF
 # Split the tickers into a list
 ticker_list = [ticker.strip() for ticker in tickers.split(',')]
 
+# Results arrive in completion order; keep traces in ticker_list order with a fixed colour per ticker
+def add_ticker_trace(fig, ticker, line):
+    position = ticker_list.index(ticker)
+    fig.add_trace(go.Scatter(
+        x=line.index,
+        y=line,
+        mode='lines',
+        name=ticker,
+        line=dict(color=qualitative.Plotly[position % len(qualitative.Plotly)])
+    ))
+    fig.data = tuple(sorted(fig.data, key=lambda trace: ticker_list.index(trace.name)))
+
 # Retrieve and plot stock price data for each ticker
 if ticker_list:
     price_fig = go.Figure()
     market_cap_fig = go.Figure()
     
-    for ticker in ticker_list:
-        stock_data = yf.Ticker(ticker)
-        hist = stock_data.history(period='max')
-        news = stock_data.news
-        st.write(stock_data)
-        
-        # Check if the data is not empty
-        if not hist.empty:
-            # Add a trace for each ticker in the price chart
-            price_fig.add_trace(go.Scatter(
-                x=hist.index,
-                y=hist['Close'],
-                mode='lines',
-                name=ticker
-            ))
-            
-            # Calculate market capitalization and add a trace for each ticker in the market cap chart
-            shares_outstanding = stock_data.info.get('sharesOutstanding')
-            if shares_outstanding:
-                hist['Market Cap'] = hist['Close'] * shares_outstanding
-                market_cap_fig.add_trace(go.Scatter(
-                    x=hist.index,
-                    y=hist['Market Cap'],
-                    mode='lines',
-                    name=ticker
-                ))
-    
     # Add range slider and range selector to the price chart
     price_fig.update_layout(
         title='Stock Prices',
@@ -96,31 +119,61 @@ if ticker_list:
         )
     )
     
-    st.plotly_chart(price_fig)
-    st.plotly_chart(market_cap_fig)
+    # Placeholders are redrawn as each ticker's data arrives, so fast tickers show up first
+    price_chart = st.empty()
+    market_cap_chart = st.empty()
+    histories = {}
+    shares = {}
+
+    max_concurrency = st.sidebar.slider('Parallel requests', 1, 32, 8)
+    keys = [(ticker, kind) for ticker in ticker_list for kind in ('history', 'news', 'shares')]
+    for (ticker, kind), result, error in fetch_concurrently(keys, fetch_ticker_data, max_concurrency=max_concurrency):
+        if error is not None:
+            st.warning(f'Could not load {kind} for {ticker}: {error}')
+            continue
+
+        if kind == 'news':
+            st.write(result)
+            continue
+        if kind == 'history':
+            # Check if the data is not empty
+            if result.empty:
+                continue
+            histories[ticker] = result
+            # Add a trace for each ticker in the price chart, downsampled outside the last year
+            add_ticker_trace(price_fig, ticker, downsample_line(result['Close']))
+            price_chart.plotly_chart(price_fig)
+        elif not result['Shares'].dropna().empty:
+            shares[ticker] = result
+
+        # Calculate market capitalization over time once both the history and the share counts are in
+        if ticker in histories and ticker in shares:
+            hist = histories.pop(ticker)
+            hist['Market Cap'] = historical_market_cap(hist['Close'], shares[ticker])
+            add_ticker_trace(market_cap_fig, ticker, downsample_line(hist['Market Cap']))
+            market_cap_chart.plotly_chart(market_cap_fig)
+
+    # Still show the (empty) charts when no ticker returned data
+    if not price_fig.data:
+        price_chart.plotly_chart(price_fig)
+    if not market_cap_fig.data:
+        market_cap_chart.plotly_chart(market_cap_fig)
     
     # Add dropdown to select a ticker and resampling interval
     selected_ticker = st.selectbox('Select Ticker for Candlestick Chart', ticker_list)
-    resample_interval = st.selectbox('Select Resampling Interval', ['D', 'W', 'M'])
+    resample_interval = st.selectbox('Select Resampling Interval', list(RESOLUTIONS))
     
     if selected_ticker:
-        selected_stock_data = yf.Ticker(selected_ticker)
-        selected_hist = selected_stock_data.history(period='max')
+        selected_hist = history_cache.get(selected_ticker, period='max')
         
         if not selected_hist.empty:
-            # Ensure the index is a DateTimeIndex and handle resampling
+            # Ensure the index is a DateTimeIndex
             selected_hist.index = pd.to_datetime(selected_hist.index)
             
-            if resample_interval != 'D':
-                resampled_hist = selected_hist.resample(resample_interval).agg({
-                    'Open': 'first',
-                    'High': 'max',
-                    'Low': 'min',
-                    'Close': 'last',
-                    'Volume': 'sum'
-                }).dropna()
-            else:
-                resampled_hist = selected_hist
+            # Switching resolution is a lookup; only bars added since the last rerun are aggregated
+            resampled_hist = get_pyramid(selected_ticker).update(selected_hist).level(resample_interval)
+            # Long daily histories are merged into min-max bars before the last year, which stays at full detail
+            resampled_hist = downsample_ohlc(resampled_hist)
             
             # Create a candlestick chart
             candlestick_fig = go.Figure(data=[go.Candlestick(
@@ -158,6 +211,11 @@ if ticker_list:
             )
             
             st.plotly_chart(candlestick_fig)
+
+    # Report how many history requests the shared cache answered without fetching
+    cache_stats = history_cache.stats()
+    st.caption(f"History cache: {cache_stats['hits'] + cache_stats['slice_hits']} hits, "
+               f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
 else:
     st.write('Please enter at least one ticker symbol.')
 
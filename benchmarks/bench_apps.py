@@ -0,0 +1,307 @@
+"""Rerun-latency benchmarks for the Streamlit apps, driven headlessly with AppTest.
+
+Every app runs against offline fixture data (or recordings made with
+MARKET_DATA_MODE=record, see --replay) with its caches emptied before the
+cold start. Each run is split into fetch, transform, figure-build and
+serialize time and written to JSON so two commits can be compared:
+
+    python benchmarks/bench_apps.py --output before.json
+    python benchmarks/bench_apps.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = tempfile.mkdtemp(prefix='bench-cache-')
+# Point the apps' on-disk caches at a scratch directory before any app module is imported
+os.environ['APP_CACHE_DIR'] = CACHE_DIR
+sys.path.insert(0, REPO_DIR)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+WORKBOOK = os.path.join(REPO_DIR, 'Plant cycle time Data.xlsx')
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PHASES = ('fetch', 'transform', 'figure_build', 'serialize')
+
+
+def upload_workbook(at):
+    with open(WORKBOOK, 'rb') as f:
+        at.file_uploader[0].set_value((os.path.basename(WORKBOOK), f.read(), XLSX_MIME))
+
+
+# Tabs created with a key keep the selected label in session state
+def open_tab(at, key, label):
+    at.session_state[key] = label
+
+
+# app -> (needs an initial run before the first step, [(step name, action), ...]).
+# The first step runs on empty caches (cold start); a plain rerun (warm) follows it.
+SCENARIOS = {
+    'streamlit_new.py': (False, [
+        ('load', None),
+        ('edit tickers', lambda at: at.text_input[0].set_value('AAPL, MSFT, GOOGL, NVDA')),
+        ('weekly bars', lambda at: at.selectbox[1].select('W')),
+        ('monthly bars', lambda at: at.selectbox[1].select('M')),
+        ('candlestick ticker', lambda at: at.selectbox[0].select('MSFT')),
+    ]),
+    'Streamlit_plotly.py': (False, [
+        ('load', None),
+        ('edit tickers', lambda at: at.text_input[0].set_value('AAPL, MSFT, GOOGL, NVDA')),
+        ('weekly bars', lambda at: at.selectbox[1].select('W')),
+        ('candlestick ticker', lambda at: at.selectbox[0].select('MSFT')),
+    ]),
+    'streamlit_demo.py': (False, [
+        ('load', None),
+        ('candlestick ticker', lambda at: at.selectbox[0].select('NVDA')),
+    ]),
+    'streamlit_app.py': (False, [
+        ('load', None),
+    ]),
+    'streamlit_altair.py': (False, [
+        ('load', None),
+        ('edit ticker', lambda at: at.text_input[0].set_value('MSFT')),
+    ]),
+    'gpt_investor.py': (True, [
+        ('enter ticker', lambda at: at.text_input[0].set_value('AAPL')),
+        ('candlestick ticker', lambda at: at.selectbox[0].select('MSFT')),
+    ]),
+    'pyg_finance2.py': (False, [
+        ('load', None),
+        ('stock ticker', lambda at: at.selectbox[0].select('TSLA')),
+        ('forex tab', lambda at: open_tab(at, 'tab', 'Forex')),
+    ]),
+    'streamlit_app2.py': (True, [
+        ('upload', upload_workbook),
+        ('monthly interval', lambda at: at.radio[0].set_value('Monthly')),
+        ('material', lambda at: at.selectbox[0].select_index(1)),
+    ]),
+    'streamlit_app3.py': (True, [
+        ('upload', upload_workbook),
+        ('weekly interval', lambda at: at.radio[0].set_value('Weekly')),
+        ('material', lambda at: at.selectbox[0].select_index(1)),
+    ]),
+    'streamlit_copilot.py': (True, [
+        ('upload', upload_workbook),
+        ('weekly interval', lambda at: at.radio[0].set_value('weekly')),
+        ('material', lambda at: at.selectbox[0].select_index(1)),
+    ]),
+}
+
+
+class PhaseTimer:
+    """Accumulates time per phase on the script thread, counting only the outermost timed call."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._active = threading.local()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name):
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        # Worker threads (e.g. concurrent fetches) are covered by the script thread waiting on them
+        if getattr(self._active, 'name', None) is not None or get_script_run_ctx(suppress_warning=True) is None:
+            yield
+            return
+        self._active.name = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+            self._active.name = None
+
+    def wrap(self, owner, attribute, name):
+        original = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return original(*args, **kwargs)
+
+        timed.__wrapped__ = original
+        setattr(owner, attribute, timed)
+
+    def wrap_generator(self, owner, attribute, name):
+        original = getattr(owner, attribute)
+        timer = self
+
+        def timed(*args, **kwargs):
+            iterator = iter(original(*args, **kwargs))
+            while True:
+                with timer.phase(name):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+
+        setattr(owner, attribute, timed)
+
+
+def instrument(timer):
+    import plotly.graph_objects as go
+    from plotly.basedatatypes import BaseFigure
+    from streamlit.delta_generator import DeltaGenerator
+
+    import concurrent_fetch
+    import market_data
+
+    for method in market_data.PROVIDER_METHODS:
+        timer.wrap(market_data.get_provider(), method, 'fetch')
+    timer.wrap_generator(concurrent_fetch, 'fetch_concurrently', 'fetch')
+
+    timer.wrap(go.Figure, '__init__', 'figure_build')
+    for method in ('add_trace', 'add_traces', 'update_layout'):
+        timer.wrap(BaseFigure, method, 'figure_build')
+    try:
+        import mplfinance
+        timer.wrap(mplfinance, 'plot', 'figure_build')
+    except ImportError:
+        pass
+
+    # Chart and table elements validate and serialize their data for the browser
+    for method in ('plotly_chart', 'altair_chart', 'vega_lite_chart', 'pyplot', 'dataframe', 'table', 'write'):
+        timer.wrap(DeltaGenerator, method, 'serialize')
+        if hasattr(st, method):
+            timer.wrap(st, method, 'serialize')
+
+
+def clear_caches():
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for name in os.listdir(CACHE_DIR):
+        shutil.rmtree(os.path.join(CACHE_DIR, name), ignore_errors=True)
+
+
+def timed_run(at, timer, timeout):
+    timer.reset()
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    total = time.perf_counter() - start
+    phases = {f'{name}_ms': timer.totals[name] * 1000 for name in ('fetch', 'figure_build', 'serialize')}
+    phases['transform_ms'] = max(total * 1000 - sum(phases.values()), 0.0)
+    return dict(total_ms=total * 1000, **phases,
+                exception=[str(e.value) for e in at.exception] or None)
+
+
+def run_scenario(app, timer, timeout):
+    needs_initial_run, steps = SCENARIOS[app]
+    clear_caches()
+    at = AppTest.from_file(os.path.join(REPO_DIR, app), default_timeout=timeout)
+    if needs_initial_run:
+        at.run()
+
+    results = []
+    for i, (step, action) in enumerate(steps):
+        if action is not None:
+            try:
+                action(at)
+            except (IndexError, KeyError, ValueError) as e:
+                # The widget is missing, usually because an earlier run raised; skip the rest
+                errors = [str(e.value) for e in at.exception] or [f'{type(e).__name__}: {e}']
+                results.append(dict(step=step, kind='skipped', total_ms=0.0, exception=errors,
+                                    **{f'{phase}_ms': 0.0 for phase in PHASES}))
+                break
+        results.append(dict(step=step, kind='cold' if i == 0 else 'interaction', **timed_run(at, timer, timeout)))
+        if i == 0:
+            results.append(dict(step='rerun', kind='warm', **timed_run(at, timer, timeout)))
+    return results
+
+
+# Median of each timing over repeats; the exception (if any) of the last repeat is kept
+def summarize(repeats):
+    summary = []
+    for runs in zip(*repeats):
+        entry = dict(runs[-1])
+        for key in ('total_ms',) + tuple(f'{phase}_ms' for phase in PHASES):
+            entry[key] = statistics.median(run[key] for run in runs)
+        summary.append(entry)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    previous = {(r['app'], r['step']): r for r in baseline['results']}
+    print(f"\n{'app':24} {'step':20} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for r in results:
+        old = previous.get((r['app'], r['step']))
+        if old is None or not old['total_ms']:
+            continue
+        change = (r['total_ms'] - old['total_ms']) / old['total_ms']
+        print(f"{r['app']:24} {r['step']:20} {old['total_ms']:10.1f} {r['total_ms']:10.1f} {change:+8.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('apps', nargs='*', default=list(SCENARIOS), help='apps to benchmark (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario; medians are reported')
+    parser.add_argument('--replay', metavar='DIR', help='replay recordings from DIR instead of fixture data')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per data call')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds allowed per script run')
+    parser.add_argument('--output', default='bench_output.json', help='where to write the JSON results')
+    parser.add_argument('--compare', metavar='JSON', help='earlier results to compare against')
+    args = parser.parse_args()
+
+    import market_data
+
+    if args.replay:
+        provider = market_data.ReplayProvider(args.replay, latency=args.latency)
+    else:
+        from fixtures import SyntheticProvider
+        provider = SyntheticProvider(latency=args.latency)
+    market_data.set_provider(provider)
+
+    timer = PhaseTimer()
+    instrument(timer)
+
+    results = []
+    for app in args.apps:
+        repeats = [run_scenario(app, timer, args.timeout) for _ in range(args.repeat)]
+        for entry in summarize(repeats):
+            results.append(dict(app=app, **entry))
+            print(f"{app:24} {entry['step']:20} {entry['kind']:12} {entry['total_ms']:9.1f} ms"
+                  + (f"  ! {entry['exception'][0].splitlines()[0][:60]}" if entry['exception'] else ''))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'source': args.replay or 'fixtures',
+        'latency_s': args.latency,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nWrote {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from history_cache import PERIOD_OFFSETS
+from market_data import MarketDataProvider
+
+FIRST_DATE = '1990-01-02'
+LAST_DATE = '2026-06-30'
+
+
+def _rng(*parts):
+    return np.random.default_rng(zlib.crc32(repr(parts).encode()))
+
+
+# Deterministic random-walk daily bars for a ticker
+def synthetic_bars(ticker, start=None, end=None):
+    dates = pd.bdate_range(FIRST_DATE, LAST_DATE, tz='America/New_York', name='Date')
+    rng = _rng('bars', ticker)
+    close = 20 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+    spread = close * rng.uniform(0.002, 0.02, len(dates))
+    open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+    bars = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, len(dates)).astype('float64'),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=dates)
+    if start is not None:
+        bars = bars[bars.index >= _localize(start, dates.tz)]
+    if end is not None:
+        bars = bars[bars.index < _localize(end, dates.tz)]
+    return bars
+
+
+def _localize(value, tz):
+    value = pd.Timestamp(value)
+    return value.tz_localize(tz) if value.tzinfo is None else value
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Offline fixture data: every ticker, currency pair and prompt gets stable made-up data.
+
+    Each call sleeps `latency` seconds to stand in for the network.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        self._wait()
+        if period not in (None, 'max'):
+            start = pd.Timestamp.now().normalize() - PERIOD_OFFSETS[period]
+        return synthetic_bars(ticker, start, end)
+
+    def download(self, tickers, start=None, end=None, interval='1d'):
+        self._wait()
+        frames = {ticker: synthetic_bars(ticker, start, end).drop(columns=['Dividends', 'Stock Splits'])
+                  for ticker in tickers}
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def news(self, ticker):
+        self._wait()
+        # Shaped like yfinance's news items
+        return [{'id': f'{ticker}-{i}', 'content': {'title': f'{ticker} headline {i}'}} for i in range(10)]
+
+    def info(self, ticker):
+        self._wait()
+        return {'sharesOutstanding': float(_rng('shares', ticker).integers(100_000_000, 10_000_000_000))}
+
+    def fundamentals(self, ticker):
+        self._wait()
+        rng = _rng('fundamentals', ticker)
+        dates = pd.date_range(FIRST_DATE, LAST_DATE, freq='QS')
+        shares = rng.integers(100_000_000, 10_000_000_000) * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        splits = pd.Series([2.0], index=pd.DatetimeIndex(['2014-06-09']))
+        return pd.concat([pd.Series(shares, index=dates, name='Shares'), splits.rename('Split')], axis=1, sort=True)
+
+    def openbb(self, name, *args, **kwargs):
+        self._wait()
+        if name == 'forex.get_currency_list':
+            return ['USD', 'EUR', 'GBP', 'JPY', 'CHF']
+        if name == 'etf.symbols':
+            return pd.DataFrame({0: ['SPY', 'QQQ', 'IWM']})
+        if name == 'economy.indices':
+            return pd.DataFrame({'Index': ['S&P 500', 'Nasdaq', 'Dow'], 'Last': [5000.0, 16000.0, 38000.0]})
+        symbol = args[0] if args else '-'.join(str(value) for value in kwargs.values())
+        return synthetic_bars(symbol, start='2021-01-01')
+
+    def complete(self, prompt, max_tokens=150, model=None):
+        self._wait()
+        # First line is read as the industry and the next five as competitor tickers
+        return 'Technology\nMSFT\nGOOGL\nAMZN\nMETA\nNVDA'
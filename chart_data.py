@@ -0,0 +1,20 @@
+import pandas as pd
+
+from time_buckets import key_labels, period_keys
+
+
+def period_aggregate(rows, level, by=None, time='END TIME', value='CYCLE TIME'):
+    """Mean and count of `value` per `level` period of `time` (and per `by` column).
+
+    This is the server-side equivalent of a Vega-Lite `timeUnit` plus
+    `mean()`/`count()` encoding: the chart receives one row per mark, so
+    its spec and render time depend on the number of periods rather than
+    on the number of batches in the range.
+    """
+    keys = pd.Series(period_keys(rows[time], level), index=rows.index, name='PERIOD')
+    values = pd.to_numeric(rows[value], errors='coerce')
+    groups = [rows[by], keys] if by else [keys]
+    stats = values.groupby(groups, observed=True).agg(['mean', 'count']).reset_index()
+    stats = stats[stats['PERIOD'] >= 0].reset_index(drop=True)
+    stats['PERIOD'] = key_labels(stats['PERIOD'], level)
+    return stats
@@ -0,0 +1,168 @@
+import glob
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+
+from figure_cache import fingerprint
+from market_data import CACHE_DIR
+
+DEFAULT_CHART_DIR = os.path.join(CACHE_DIR, 'charts')
+RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', '2'))
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chart_worker.py')
+
+
+class RenderError(Exception):
+    pass
+
+
+class ChartRenderer:
+    """Renders matplotlib / mplfinance figures in worker processes and caches the image bytes on disk.
+
+    Images are keyed by a fingerprint of the data, the style arguments, the
+    format and the resolution, so an unchanged chart is read from disk
+    instead of redrawn. Each worker process (chart_worker.py) has its own
+    matplotlib state (Agg backend), so sessions never wait on one another's
+    figures, and concurrent requests for the same chart share a single
+    render. When the images exceed `max_bytes`, the least recently used
+    ones are removed first.
+    """
+
+    def __init__(self, root=DEFAULT_CHART_DIR, workers=RENDER_WORKERS, max_bytes=64 << 20):
+        self.root = root
+        self.workers = workers
+        self.max_bytes = max_bytes
+        # Idle worker processes; at most `workers` are started, each serving one request at a time
+        self._idle = queue.Queue()
+        self._started = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    # Workers run chart_worker.py as their main module, so they never import the app script
+    def _start_worker(self):
+        return subprocess.Popen([sys.executable, WORKER_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle.empty() and self._started < self.workers:
+                self._started += 1
+                start = True
+            else:
+                start = False
+        if start:
+            try:
+                return self._start_worker()
+            except BaseException:
+                with self._lock:
+                    self._started -= 1
+                raise
+        return self._idle.get()
+
+    def _call(self, request):
+        worker = self._acquire()
+        try:
+            pickle.dump(request, worker.stdin)
+            worker.stdin.flush()
+            ok, reply = pickle.load(worker.stdout)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # The worker died mid-render (crashed or was killed): replace it so later charts still render
+            worker.kill()
+            worker.wait()
+            try:
+                self._idle.put(self._start_worker())
+            except OSError:
+                with self._lock:
+                    self._started -= 1
+            raise RenderError(f'Chart worker exited with code {worker.returncode} while rendering') from None
+        self._idle.put(worker)
+        if not ok:
+            raise RenderError(reply)
+        return reply
+
+    def render(self, kind, data, fmt='png', dpi=100, **style):
+        """Image bytes of a `kind` ('mplfinance' or 'lines') chart of `data`."""
+        key = fingerprint(kind, data, dict(sorted(style.items())), fmt, dpi)
+        path = os.path.join(self.root, f'{key}.{fmt}')
+        try:
+            with open(path, 'rb') as f:
+                image = f.read()
+            os.utime(path)
+            return image
+        except OSError:
+            pass
+
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if owner:
+            try:
+                future.set_result(self._call((kind, data, style, fmt, dpi)))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        image = future.result()
+
+        if owner:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+            self._evict()
+        return image
+
+    def _evict(self):
+        with self._evict_lock:
+            entries = []
+            for path in glob.glob(os.path.join(self.root, '*.*')):
+                if path.endswith('.tmp'):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            # Least recently used first, until the images fit
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+    # Stop the idle workers; busy ones are reused when their render finishes
+    def shutdown(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._started -= 1
+            worker.stdin.close()
+            worker.wait()
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer():
+    """The process-wide renderer; its workers start with the first chart that is not cached."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+        return _renderer
@@ -0,0 +1,74 @@
+import io
+import pickle
+import sys
+import traceback
+
+
+def _init_worker():
+    import matplotlib
+
+    # Raster/vector output only; no GUI backend in the workers
+    matplotlib.use('Agg')
+    import mplfinance  # noqa: F401
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _draw_mplfinance(data, style):
+    import mplfinance as mpf
+
+    fig, _ = mpf.plot(data, returnfig=True, **style)
+    return fig
+
+
+# One line per column, e.g. closing prices of several tickers
+def _draw_lines(data, style):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=style.get('figsize', (10, 6)))
+    for column in data.columns:
+        ax.plot(data.index, data[column], label=column)
+    if style.get('title'):
+        ax.set_title(style['title'])
+    ax.legend()
+    return fig
+
+
+DRAW = {'mplfinance': _draw_mplfinance, 'lines': _draw_lines}
+
+
+def _render(kind, data, style, fmt, dpi):
+    import matplotlib.pyplot as plt
+
+    fig = DRAW[kind](data, style)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+# Entry point of a render worker process started by chart_render.ChartRenderer. Being its own main
+# module, the worker never imports the Streamlit app that asked for the chart. Requests are pickled
+# (kind, data, style, fmt, dpi) tuples on stdin; each reply on stdout is (True, image bytes) or
+# (False, formatted traceback). The worker exits when stdin is closed.
+def main():
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    # Anything the drawing code prints goes to stderr rather than into the reply stream
+    sys.stdout = sys.stderr
+    _init_worker()
+    while True:
+        try:
+            request = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = (True, _render(*request))
+        except Exception:
+            reply = (False, traceback.format_exc())
+        pickle.dump(reply, replies)
+        replies.flush()
+
+
+if __name__ == '__main__':
+    main()
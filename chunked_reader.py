@@ -0,0 +1,115 @@
+import csv
+import hashlib
+import os
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 50_000
+# Delimiters recognized in CSV files
+CSV_DELIMITERS = ',;\t|'
+
+
+def _open(source):
+    return open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+
+
+# SHA-1 of `salt` followed by the content of a path or UploadedFile, read in blocks
+def content_hash(source, salt=b''):
+    digest = hashlib.sha1(salt)
+    f = _open(source)
+    try:
+        f.seek(0)
+        while block := f.read(1 << 20):
+            digest.update(block)
+    finally:
+        if f is not source:
+            f.close()
+    return digest.hexdigest()
+
+
+def _size(f):
+    position = f.tell()
+    size = f.seek(0, os.SEEK_END)
+    f.seek(position)
+    return max(size, 1)
+
+
+# Delimiter of a CSV file, guessed from its first complete lines (any line endings)
+def _sniff_sep(f):
+    position = f.tell()
+    sample = f.read(64 << 10)
+    f.seek(position)
+    if isinstance(sample, bytes):
+        sample = sample.decode('utf-8', errors='replace')
+    lines = sample.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if len(lines) > 1:
+        lines = lines[:-1]
+    if not any(delimiter in lines[0] for delimiter in CSV_DELIMITERS):
+        # A single column
+        return ','
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines), delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        raise ValueError(f'Could not detect the CSV delimiter; supported delimiters are '
+                         f'{", ".join(map(repr, CSV_DELIMITERS))}') from None
+
+
+def _csv_chunks(f, chunk_rows, sep):
+    total = _size(f)
+    if sep is None:
+        sep = _sniff_sep(f)
+    for chunk in pd.read_csv(f, sep=sep, chunksize=chunk_rows):
+        # The parser reads ahead in blocks, so this runs slightly ahead of the rows returned
+        yield chunk, min(f.tell() / total, 1.0)
+
+
+def _parquet_chunks(f, chunk_rows):
+    parquet = pq.ParquetFile(f)
+    total, done = max(parquet.metadata.num_rows, 1), 0
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        done += batch.num_rows
+        yield batch.to_pandas(), done / total
+
+
+def _xlsx_chunks(f, chunk_rows):
+    # Read-only mode streams the sheet XML instead of building every cell in memory
+    workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        total, done = max((sheet.max_row or 0) - 1, 1), 0
+        while block := list(islice(rows, chunk_rows)):
+            done += len(block)
+            yield pd.DataFrame.from_records(block, columns=header), min(done / total, 1.0)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, sep=None):
+    """(DataFrame, fraction read) for successive `chunk_rows`-row chunks of an .xlsx, .csv or .parquet file.
+
+    `source` is a path or a Streamlit UploadedFile; only one chunk of rows
+    is materialized at a time. The first sheet of a workbook is read, with
+    its first row as the header. A CSV file's delimiter is detected from
+    its first lines unless `sep` is given.
+    """
+    name = os.fspath(source) if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    extension = os.path.splitext(name)[1].lower()
+    f = _open(source)
+    try:
+        f.seek(0)
+        if extension == '.csv':
+            yield from _csv_chunks(f, chunk_rows, sep)
+        elif extension == '.parquet':
+            yield from _parquet_chunks(f, chunk_rows)
+        else:
+            yield from _xlsx_chunks(f, chunk_rows)
+    finally:
+        if f is not source:
+            f.close()
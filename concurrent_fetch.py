@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+
+class FetchTimeout(Exception):
+    pass
+
+
+# Hard cap on attempt threads alive in this process, across every caller, rerun and session. Timed-out
+# attempts keep their thread until they return, so this bounds the requests a hung upstream can pile up.
+MAX_LIVE_ATTEMPTS = int(os.environ.get('FETCH_MAX_LIVE_ATTEMPTS', '64'))
+_live_attempts = threading.BoundedSemaphore(MAX_LIVE_ATTEMPTS)
+
+
+# Run one attempt on its own daemon thread, holding one of the live-attempt slots until it returns (even
+# after it has been abandoned). The timeout counts from `started_at`.
+def _start_attempt(fetch, key):
+    future = Future()
+    future.started_at = time.monotonic()
+
+    def run():
+        future.started_at = time.monotonic()
+        future.set_running_or_notify_cancel()
+        try:
+            result = fetch(key)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            _live_attempts.release()
+
+    try:
+        threading.Thread(target=run, name='fetch-attempt', daemon=True).start()
+    except BaseException:
+        _live_attempts.release()
+        raise
+    return future
+
+
+def fetch_concurrently(keys, fetch, max_concurrency=8, timeout=15.0, retries=2, backoff=0.5):
+    """Run `fetch(key)` for every key on worker threads and yield results as they finish.
+
+    Yields `(key, result, error)` tuples in completion order, with `error` set
+    (and `result` None) once a key has failed `retries + 1` attempts. At most
+    `max_concurrency` attempts run at once; an attempt running longer than
+    `timeout` seconds (counted from when it starts) is abandoned and retried
+    after an exponential backoff, so a slow or failing key never holds up
+    the others.
+
+    Abandoned attempts still count against the limits until they return: a
+    call keeps at most `2 * max_concurrency` attempt threads alive, the
+    process at most MAX_LIVE_ATTEMPTS, and a key is not retried while its
+    earlier attempt is still running (that retry fails as a timeout too).
+
+    The generator is consumed on the calling thread, so the caller can update
+    Streamlit elements between results; `fetch` itself must not call Streamlit.
+    """
+    keys = list(keys)
+    queue = [(0.0, key, 0) for key in keys]  # (ready_at, key, attempt)
+    running = {}  # future -> (key, attempt)
+    abandoned = {}  # key -> future of its timed-out attempt, while that is still running
+
+    def failed(key, attempt, error, now):
+        if attempt < retries:
+            queue.append((now + backoff * 2 ** attempt, key, attempt + 1))
+            return None
+        return key, None, error
+
+    while queue or running:
+        now = time.monotonic()
+        abandoned = {key: future for key, future in abandoned.items() if not future.done()}
+        blocked = False
+        for item in sorted((item for item in queue if item[0] <= now), key=lambda item: item[0]):
+            _, key, attempt = item
+            if key in abandoned:
+                queue.remove(item)
+                outcome = failed(key, attempt, FetchTimeout(f'{key} is still waiting on an earlier attempt'), now)
+                if outcome is not None:
+                    yield outcome
+                continue
+            if len(running) >= max_concurrency or len(running) + len(abandoned) >= 2 * max_concurrency \
+                    or not _live_attempts.acquire(blocking=False):
+                blocked = True
+                break
+            queue.remove(item)
+            running[_start_attempt(fetch, key)] = (key, attempt)
+
+        if not queue and not running:
+            break
+
+        # Wake up for the next completion (including an abandoned attempt freeing its thread), the next
+        # timeout, or the next retry becoming ready
+        deadlines = [future.started_at + timeout for future in running]
+        deadlines += [item[0] for item in queue if item[0] > now]
+        if blocked and not running:
+            # Slots held by other callers' attempts are released without notice; poll for them
+            deadlines.append(now + 0.05)
+        wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+        done, _ = wait(set(running) | set(abandoned.values()), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        now = time.monotonic()
+        for future in list(running):
+            key, attempt = running[future]
+            if future in done:
+                error = future.exception()
+            elif now - future.started_at >= timeout:
+                error = FetchTimeout(f'{key} did not respond within {timeout:g}s')
+                abandoned[key] = future
+            else:
+                continue
+            del running[future]
+
+            if error is None:
+                yield key, future.result(), None
+            else:
+                outcome = failed(key, attempt, error, now)
+                if outcome is not None:
+                    yield outcome
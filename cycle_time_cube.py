@@ -0,0 +1,149 @@
+import threading
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cycle_time_data import stream_rows
+from quantile_sketch import QuantileSketch, box_stats
+from spc import SPCEngine
+from time_buckets import LEVELS, key_labels, period_keys
+
+# Per-cell statistics; all of them can be combined when new batches arrive
+STATS = ['sum', 'count', 'min', 'max', 'sumsq']
+
+
+def _cells(rows, level, value, by_material):
+    keys = [pd.Series(period_keys(rows['END TIME'], level), index=rows.index, name='PERIOD')]
+    if by_material:
+        keys.insert(0, rows['MATERIAL'].astype(str))
+    values = rows[value].astype('float64')
+    grouped = pd.DataFrame({'value': values, 'square': values * values}).groupby(keys, observed=True)
+    cells = grouped['value'].agg(['sum', 'count', 'min', 'max'])
+    cells['sumsq'] = grouped['square'].sum()
+    return cells
+
+
+def _merge(cells, update):
+    if cells is None:
+        return update
+    existing = cells.reindex(update.index)
+    merged = pd.DataFrame({
+        'sum': existing['sum'].fillna(0) + update['sum'],
+        'count': existing['count'].fillna(0) + update['count'],
+        'min': np.fmin(existing['min'], update['min']),
+        'max': np.fmax(existing['max'], update['max']),
+        'sumsq': existing['sumsq'].fillna(0) + update['sumsq'],
+    }, index=update.index)
+    return pd.concat([cells.drop(update.index, errors='ignore'), merged]).sort_index()
+
+
+# Cells keyed by integer period are labelled only when they are looked up
+def _with_moments(cells, level):
+    cells = cells.reset_index()
+    cells['PERIOD'] = key_labels(cells['PERIOD'], level)
+    cells['mean'] = cells['sum'] / cells['count']
+    variance = (cells['sumsq'] - cells['count'] * cells['mean'] ** 2) / (cells['count'] - 1)
+    cells['std'] = np.sqrt(variance.clip(lower=0))
+    return cells
+
+
+class CycleTimeCube:
+    """Sum, count, min, max and sum of squares of cycle time per material × period.
+
+    Built once per dataset for week, month and quarter, plus an
+    all-materials rollup; interval toggles then read precomputed cells.
+    `add()` merges new batches into just the cells they fall in.
+
+    A quantile sketch per material and day backs the box plots; days are
+    merged into weeks, months or quarters on first lookup.
+    """
+
+    def __init__(self, levels=LEVELS, value='CYCLE TIME'):
+        self.levels = tuple(levels)
+        self.value = value
+        self.by_material = {level: None for level in self.levels}
+        self.overall = {level: None for level in self.levels}
+        # material -> {day: QuantileSketch}
+        self.sketches = {}
+        # Derived frames (with mean and std) per lookup, dropped whenever cells change
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        rows = rows.dropna(subset=['END TIME', self.value])
+        if rows.empty:
+            return self
+        with self._lock:
+            for level in self.levels:
+                self.by_material[level] = _merge(self.by_material[level], _cells(rows, level, self.value, True))
+                self.overall[level] = _merge(self.overall[level], _cells(rows, level, self.value, False))
+            # Split the rows into (material, day) runs with numpy; there can be a great many of them
+            codes, materials = pd.factorize(rows['MATERIAL'].astype(str))
+            days = rows['END TIME'].dt.normalize().to_numpy()
+            values = rows[self.value].to_numpy(dtype='float64')
+            order = np.lexsort((days, codes))
+            codes, days, values = codes[order], days[order], values[order]
+            starts = np.flatnonzero((codes[1:] != codes[:-1]) | (days[1:] != days[:-1])) + 1
+            firsts = np.r_[0, starts]
+            for code, day, chunk in zip(codes[firsts], days[firsts], np.split(values, starts)):
+                day_sketches = self.sketches.setdefault(materials[code], {})
+                day_sketches.setdefault(day, QuantileSketch()).update(chunk)
+            self._views.clear()
+        return self
+
+    def _view(self, cells, key):
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = _with_moments(cells[key[1]], key[1])
+            return self._views[key]
+
+    # Materials seen so far, e.g. for a selector
+    def materials(self):
+        with self._lock:
+            return sorted(self.sketches)
+
+    # One row per (MATERIAL, PERIOD) with the raw cell statistics plus mean and std
+    def material_stats(self, level):
+        return self._view(self.by_material, ('material', level))
+
+    # One row per PERIOD over all materials
+    def overall_stats(self, level):
+        return self._view(self.overall, ('overall', level))
+
+    # Box-plot statistics per PERIOD for one material, plus its outliers as (PERIOD, value) rows;
+    # `start`/`end` keep only the days in [start, end)
+    def box_stats(self, material, level, start=None, end=None):
+        key = ('box', material, level, start, end)
+        with self._lock:
+            if key not in self._views:
+                day_sketches = self.sketches.get(str(material), {})
+                days = pd.Series(list(day_sketches), dtype='datetime64[ns]')
+                if start is not None:
+                    days = days[days >= pd.Timestamp(start)]
+                if end is not None:
+                    days = days[days < pd.Timestamp(end)]
+                boxes, outliers = [], []
+                for period, group in days.groupby(period_keys(days, level)):
+                    stats, values = box_stats(reduce(QuantileSketch.merge, (day_sketches[day] for day in group)))
+                    boxes.append(dict(PERIOD=period, **stats))
+                    outliers.extend(dict(PERIOD=period, value=value) for value in values)
+                boxes = pd.DataFrame(boxes, columns=['PERIOD', 'count', 'lower', 'q1', 'median', 'q3', 'upper'])
+                outliers = pd.DataFrame(outliers, columns=['PERIOD', 'value'])
+                boxes['PERIOD'] = key_labels(boxes['PERIOD'], level)
+                outliers['PERIOD'] = key_labels(outliers['PERIOD'], level)
+                self._views[key] = (boxes, outliers)
+            return self._views[key]
+
+
+# The cube of an uploaded file, plus its SPC state when `with_spc` is set (None otherwise). The file is
+# streamed once per server process, with a progress bar, and the result is shared by every app and session.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_cube(dataset, _source, with_spc=False):
+    progress = st.progress(0.0, text='Reading batches...')
+    cube, spc = CycleTimeCube(), SPCEngine() if with_spc else None
+    sinks = [cube, spc] if with_spc else [cube]
+    stream_rows(_source, sinks, lambda done: progress.progress(done, text=f'Reading batches... {done:.0%}'))
+    progress.empty()
+    return cube, spc
@@ -0,0 +1,176 @@
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from chunked_reader import CHUNK_ROWS, content_hash, iter_chunks
+from market_data import CACHE_DIR
+
+DEFAULT_WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Plant cycle time Data.xlsx')
+DEFAULT_INGEST_DIR = os.path.join(CACHE_DIR, 'cycle_time')
+
+# Explicit column types for the plant cycle-time export; bump SCHEMA_VERSION when this changes
+# so Parquet files written with the old schema are not reused
+SCHEMA_VERSION = 1
+SCHEMA = {
+    'START BATCH CODE': 'category',
+    'START EVENT MONTH': 'int8',
+    'START EVENT CALENDAR WEEK': 'int8',
+    'END BATCH CODE': 'category',
+    'MATERIAL': 'category',
+    'END TIME': 'datetime64[ns]',
+    'END EVENT MONTH': 'int8',
+    'END EVENT CALENDAR WEEK': 'int8',
+    'YEAR WEEK': 'category',
+    'CYCLE TIME': 'int32',
+    'TARGET CYCLE TIME': 'int32',
+}
+
+
+def _digest(source):
+    return content_hash(source, salt=f'schema-{SCHEMA_VERSION}'.encode())
+
+
+# Stable key for a file's content, for caching anything derived from its rows
+def dataset_key(source):
+    return _digest(source)
+
+
+def _cache_path(source, cache_dir):
+    return os.path.join(cache_dir, f'{_digest(source)}.parquet')
+
+
+def apply_schema(data):
+    # Rows without a cycle time (e.g. a trailing blank line) can't be typed as integers
+    data = data.dropna(subset=[column for column in ('CYCLE TIME', 'END TIME') if column in data.columns])
+    types = {column: dtype for column, dtype in SCHEMA.items() if column in data.columns}
+    if 'END TIME' in types:
+        data = data.assign(**{'END TIME': pd.to_datetime(data['END TIME'])})
+    return data.astype(types).reset_index(drop=True)
+
+
+# Arrow schema for the Parquet cache; category codes are widened so every chunk shares one type
+def _arrow_schema(table):
+    fields = [field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+              if pa.types.is_dictionary(field.type) else field for field in table.schema]
+    return pa.schema(fields)
+
+
+def iter_cycle_times(source=DEFAULT_WORKBOOK, chunk_rows=CHUNK_ROWS, cache_dir=DEFAULT_INGEST_DIR):
+    """Typed chunks of cycle-time rows with the fraction of the file read so far.
+
+    The first pass over a file streams it chunk by chunk and appends each
+    typed chunk to its Parquet cache, so memory stays bounded by the chunk
+    size; later passes stream the cached row groups instead.
+    """
+    path = _cache_path(source, cache_dir)
+    if os.path.exists(path):
+        yield from iter_chunks(path, chunk_rows)
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    try:
+        for chunk, done in iter_chunks(source, chunk_rows):
+            chunk = apply_schema(chunk)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = _arrow_schema(table)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table.cast(schema))
+            yield chunk, done
+        if writer is None:
+            apply_schema(pd.DataFrame(columns=list(SCHEMA))).to_parquet(tmp_path, index=False)
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp_path, path)
+    finally:
+        # Left behind only when the caller stopped early or parsing failed
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Rows of a Parquet file whose row groups are each sorted by END TIME, merged into END TIME order (ties
+# keep file order). Only one `batch_rows` slice of each row group is in memory at a time.
+def _merge_sorted_runs(path, batch_rows=8192):
+    parquet = pq.ParquetFile(path)
+    runs = [parquet.iter_batches(batch_size=batch_rows, row_groups=[i]) for i in range(parquet.num_row_groups)]
+
+    def next_slice(run):
+        batch = next(run, None)
+        return None if batch is None else batch.to_pandas()
+
+    heads = [next_slice(run) for run in runs]
+    while any(head is not None for head in heads):
+        # Every row up to the smallest of the heads' last times is final: no run has an earlier row left
+        cutoff = min(head['END TIME'].iloc[-1] for head in heads if head is not None)
+        block = []
+        for i, head in enumerate(heads):
+            if head is None:
+                continue
+            n = head['END TIME'].searchsorted(cutoff, side='right')
+            block.append(head.iloc[:n])
+            heads[i] = head.iloc[n:] if n < len(head) else next_slice(runs[i])
+        yield pd.concat(block, ignore_index=True).sort_values('END TIME', kind='stable')
+
+
+# Feed each typed chunk of a file to every sink's add(), calling `progress` with the fraction done so far.
+# Sinks with `ordered = True` (e.g. SPCEngine) need the rows in END TIME order, which the file is at best
+# within each chunk: each chunk is sorted and spilled as one row group of a temporary Parquet file, and
+# the row groups are then merged, so memory stays bounded by the chunk size.
+def stream_rows(source, sinks, progress=None, chunk_rows=CHUNK_ROWS, cache_dir=DEFAULT_INGEST_DIR):
+    ordered = [sink for sink in sinks if getattr(sink, 'ordered', False)]
+    unordered = [sink for sink in sinks if not getattr(sink, 'ordered', False)]
+    share = 0.5 if ordered else 1.0
+    runs_path = f'{_cache_path(source, cache_dir)}.runs.{os.getpid()}.{threading.get_ident()}.tmp'
+    writer = None
+    total = 0
+    try:
+        for chunk, done in iter_cycle_times(source, chunk_rows, cache_dir):
+            for sink in unordered:
+                sink.add(chunk)
+            if ordered and not chunk.empty:
+                table = pa.Table.from_pandas(chunk.sort_values('END TIME', kind='stable'), preserve_index=False)
+                if writer is None:
+                    schema = _arrow_schema(table)
+                    writer = pq.ParquetWriter(runs_path, schema)
+                writer.write_table(table.cast(schema), row_group_size=len(chunk))
+                total += len(chunk)
+            if progress is not None:
+                progress(share * done)
+        if writer is None:
+            return
+        writer.close()
+        writer = None
+
+        fed = 0
+        for block in _merge_sorted_runs(runs_path):
+            for sink in ordered:
+                sink.add(block)
+            fed += len(block)
+            if progress is not None:
+                progress(share + share * fed / total)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(runs_path):
+            os.remove(runs_path)
+
+
+def load_cycle_times(source=DEFAULT_WORKBOOK, cache_dir=DEFAULT_INGEST_DIR):
+    """Cycle-time rows from an .xlsx, .csv or .parquet file (path or upload), with compact dtypes.
+
+    The typed result is saved as Parquet under the SHA-1 of the file's
+    content, so the workbook is only parsed the first time any app sees it.
+    """
+    path = _cache_path(source, cache_dir)
+    if not os.path.exists(path):
+        for _ in iter_cycle_times(source, cache_dir=cache_dir):
+            pass
+    return pd.read_parquet(path)
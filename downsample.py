@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Points sent to the browser per trace
+DEFAULT_POINT_BUDGET = 2000
+
+# The widest rangeselector zoom short of 'all'; data inside it is always sent at full detail
+# so the 1m/3m/6m/YTD/1y buttons show every bar
+DEFAULT_DETAIL_WINDOW = pd.DateOffset(years=1)
+
+
+# Largest-Triangle-Three-Buckets: positions of `n` points that preserve the shape of the line
+def lttb(x, y, n):
+    length = len(x)
+    if n >= length or n < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # The first and last points are always kept; the rest is split into n - 2 buckets
+    edges = np.linspace(1, length - 1, n - 1).astype(np.int64)
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    a = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else length
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# Merge consecutive bars into `n` bars whose high/low envelope matches the original
+def minmax_ohlc(bars, n):
+    if n >= len(bars) or n < 1:
+        return bars
+    starts = np.unique(np.linspace(0, len(bars), n, endpoint=False).astype(np.int64))
+    ends = np.r_[starts[1:], len(bars)] - 1
+    columns = {
+        'Open': bars['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(bars['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(bars['Low'].to_numpy(), starts),
+        'Close': bars['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in bars:
+        columns['Volume'] = np.add.reduceat(bars['Volume'].to_numpy(), starts)
+    return pd.DataFrame(columns, index=bars.index[starts])
+
+
+def _split_detail_window(index, detail_window):
+    if detail_window is None or len(index) == 0:
+        return len(index)
+    return index.searchsorted(index[-1] - detail_window)
+
+
+# Series reduced to about `budget` points: LTTB over older history, full detail in the recent window
+def downsample_line(series, budget=DEFAULT_POINT_BUDGET, detail_window=DEFAULT_DETAIL_WINDOW):
+    series = series.dropna()
+    if len(series) <= budget:
+        return series
+    split = _split_detail_window(series.index, detail_window)
+    older, recent = series.iloc[:split], series.iloc[split:]
+    keep = lttb(older.index.asi8, older.to_numpy(), max(budget - len(recent), 3))
+    return pd.concat([older.iloc[keep], recent])
+
+
+# OHLC bars reduced to about `budget` bars: min-max envelopes over older history, full detail recently
+def downsample_ohlc(bars, budget=DEFAULT_POINT_BUDGET, detail_window=DEFAULT_DETAIL_WINDOW):
+    if len(bars) <= budget:
+        return bars
+    split = _split_detail_window(bars.index, detail_window)
+    older, recent = bars.iloc[:split], bars.iloc[split:]
+    return pd.concat([minmax_ohlc(older, max(budget - len(recent), 1)), recent])
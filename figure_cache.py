@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+import pandas as pd
+import streamlit as st
+
+
+# Stable hash of chart inputs: frames and series are hashed by content, everything else by repr
+def fingerprint(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, dict):
+            for key, value in part.items():
+                digest.update(repr(key).encode())
+                digest.update(fingerprint(value).encode())
+        elif isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+# Streamlit records the chart element emitted inside a cached function and replays it on a hit,
+# so an unchanged chart is neither rebuilt nor re-serialized on later reruns or in other sessions
+@st.cache_data(max_entries=64, show_spinner=False)
+def _render_figure(name, key, _build):
+    start = time.perf_counter()
+    fig = _build()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # st.plotly_chart validates and serializes the figure to JSON for the browser
+    start = time.perf_counter()
+    st.plotly_chart(fig)
+    serialize_ms = (time.perf_counter() - start) * 1000
+    return {'build_ms': build_ms, 'serialize_ms': serialize_ms}
+
+
+def plotly_chart_cached(name, inputs, build):
+    """Draw the figure returned by `build()`, reusing the cached chart if `inputs` are unchanged.
+
+    `inputs` is everything the figure depends on (data and layout
+    parameters). Returns a timing record for the chart.
+    """
+    start = time.perf_counter()
+    key = fingerprint(name, *inputs)
+    fingerprint_ms = (time.perf_counter() - start) * 1000
+
+    built = []
+
+    def tracked_build():
+        built.append(True)
+        return build()
+
+    start = time.perf_counter()
+    timing = dict(_render_figure(name, key, tracked_build))
+    total_ms = (time.perf_counter() - start) * 1000
+    timing.update(chart=name, cached=not built, fingerprint_ms=fingerprint_ms, total_ms=total_ms)
+    if not built:
+        timing.update(build_ms=0.0, serialize_ms=0.0)
+    return timing
+
+
+# Date x-axis with the 1m/3m/6m/YTD/1y/all range selector and a range slider
+def date_range_xaxis():
+    return dict(
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label='1m', step='month', stepmode='backward'),
+                dict(count=3, label='3m', step='month', stepmode='backward'),
+                dict(count=6, label='6m', step='month', stepmode='backward'),
+                dict(count=1, label='YTD', step='year', stepmode='todate'),
+                dict(count=1, label='1y', step='year', stepmode='backward'),
+                dict(step='all')
+            ])
+        ),
+        rangeslider=dict(
+            visible=True
+        ),
+        type='date'
+    )
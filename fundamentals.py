@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from concurrent_fetch import fetch_concurrently
+from market_data import CACHE_DIR, get_provider
+
+DEFAULT_FUNDAMENTALS_DIR = os.path.join(CACHE_DIR, 'fundamentals')
+
+
+# Default source: the market data provider's share count ('Shares') and split ('Split') history
+def provider_fundamentals(ticker):
+    return get_provider().fundamentals(ticker)
+
+
+class FundamentalsCache:
+    """Share count and split history per ticker, kept as Parquet files on disk.
+
+    A ticker is re-fetched from `source` once its file is older than
+    `max_age` seconds; `load_many` refreshes stale tickers concurrently.
+    """
+
+    def __init__(self, root=DEFAULT_FUNDAMENTALS_DIR, source=provider_fundamentals, max_age=24 * 60 * 60):
+        self.root = root
+        self.source = source
+        self.max_age = max_age
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, ticker):
+        safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in ticker.upper())
+        return os.path.join(self.root, f'{safe_name}.parquet')
+
+    def is_stale(self, ticker):
+        path = self.path(ticker)
+        return not os.path.exists(path) or time.time() - os.path.getmtime(path) > self.max_age
+
+    def load(self, ticker):
+        if self.is_stale(ticker):
+            return self.refresh(ticker)
+        return pd.read_parquet(self.path(ticker))
+
+    # Fundamentals for several tickers; stale ones are fetched in parallel, failures are left out
+    def load_many(self, tickers, max_concurrency=8):
+        stale = [ticker for ticker in tickers if self.is_stale(ticker)]
+        for _ in fetch_concurrently(stale, self.refresh, max_concurrency=max_concurrency):
+            pass
+        return {ticker: pd.read_parquet(self.path(ticker)) for ticker in tickers if os.path.exists(self.path(ticker))}
+
+    def refresh(self, ticker):
+        data = self.source(ticker)
+        data = data.reindex(columns=['Shares', 'Split']).astype('float64')
+        data.index = pd.DatetimeIndex(pd.to_datetime(data.index))
+        if data.index.tz is not None:
+            data.index = data.index.tz_localize(None)
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        path = self.path(ticker)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        return data
+
+
+# Dates as int64 nanoseconds in exchange-local wall-clock time, so aware and naive indexes compare
+def _wall_clock(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit('ns').asi8
+
+
+# Split-adjusted share count for each date in `index` (as-of join, earliest count before the first report)
+def shares_outstanding(index, fundamentals):
+    shares = fundamentals['Shares'].dropna()
+    if shares.empty:
+        return np.full(len(index), np.nan)
+    splits = fundamentals['Split'].dropna()
+    splits = splits[splits > 0]
+    share_counts = shares.to_numpy(dtype='float64')
+    if not splits.empty:
+        # Prices are split-adjusted, so a count reported before a split is scaled by every later split ratio
+        later_splits = np.r_[np.cumprod(splits.to_numpy()[::-1])[::-1], 1.0]
+        share_counts = share_counts * later_splits[np.searchsorted(_wall_clock(splits.index), _wall_clock(shares.index), side='right')]
+    positions = np.searchsorted(_wall_clock(shares.index), _wall_clock(index), side='right') - 1
+    return share_counts[np.clip(positions, 0, None)]
+
+
+# Market capitalization over time: close prices times the share count in effect on each date
+def historical_market_cap(close, fundamentals):
+    return pd.Series(close.to_numpy() * shares_outstanding(close.index, fundamentals), index=close.index, name='Market Cap')
@@ -1,39 +1,68 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-import anthropic
 import openai
+from chart_render import get_chart_renderer
+from headline_sentiment import SentimentStore, summarize
+from history_cache import HistoryCache
+from llm_cache import LLMClient
+from market_data import get_provider
+
+# Price history cache shared by all sessions; sub-ranges are sliced from cached wider ranges
+@st.cache_resource
+def get_history_cache():
+    return HistoryCache()
+
+history_cache = get_history_cache()
+
+# Closing prices for several tickers on a shared (timezone-naive) date index
+def get_close_prices(tickers, start):
+    closes = {}
+    for t in tickers:
+        close = history_cache.get(t, start=start)['Close']
+        close.index = pd.to_datetime(close.index).tz_localize(None).normalize()
+        closes[t] = close
+    return pd.DataFrame(closes)
 
-# Set up Anthropic API client
-client = anthropic.Anthropic(api_key="")
+# LLM completions cached on disk per trading date and shared by all sessions
+@st.cache_resource
+def get_llm_client():
+    return LLMClient()
 
-# Function to call Anthropic API for industry and competitor information
-def get_company_info(ticker):
-    prompt = f"Investor analysis for {ticker}. Provide industry and 5 competitors."
-    response = client.completions.create(prompt=prompt, max_tokens=150)
-    return response['choices'][0]['text']
+llm = get_llm_client()
 
-# Function to get sentiment analysis
-def get_sentiment_analysis(news):
-    prompt = f"Perform sentiment analysis on the following news: {news}"
-    response = client.completions.create(prompt=prompt, max_tokens=150)
-    return response['choices'][0]['text']
+# Sentiment scores per headline, kept on disk and reused across tickers and sessions
+@st.cache_resource
+def get_sentiment_store():
+    return SentimentStore(llm=llm)
+
+# Prompt for the Anthropic API: industry and competitor information
+def company_info_prompt(ticker):
+    return f"Investor analysis for {ticker}. Provide industry and 5 competitors."
+
+# Prompt for analyst rating and industry analysis
+def analyst_industry_prompt(ticker):
+    return f"Provide analyst rating and industry analysis for {ticker}."
+
+# News headlines for a ticker, refreshed every 15 minutes; yfinance nests each item's fields under 'content'
+@st.cache_data(ttl=900, show_spinner=False)
+def get_news_titles(ticker):
+    return [item.get('content', item)['title'] for item in get_provider().news(ticker)]
 
-# Function to get analyst rating and industry analysis
-def get_analyst_industry_analysis(ticker):
-    prompt = f"Provide analyst rating and industry analysis for {ticker}."
-    response = client.completions.create(prompt=prompt, max_tokens=150)
-    return response['choices'][0]['text']
+# The two analyses are independent, so they are requested together; repeats are served from disk
+def get_analyses(ticker):
+    return llm.complete_many([company_info_prompt(ticker), analyst_industry_prompt(ticker)], max_tokens=150)
 
-# Function to get news sentiment analysis and generate a recommendation
+# Sentiment analysis: only headlines that were never scored before are sent to the model
+def get_sentiment_analysis(news):
+    return get_sentiment_store().score(news)
+
+# Prompt for a recommendation from the stock data, news sentiment and industry analysis
 def generate_recommendation(stock_data, sentiment, analyst_industry):
     # Analyze stock data
-    close_prices = stock_data['Close']
-    avg_close = close_prices.mean()
+    avg_close = stock_data.mean()
     
-    recommendation = f"Based on the data, sentiment analysis and industry analysis: \nAverage closing price: {avg_close}\nSentiment: {sentiment}\nAnalyst and Industry Analysis: {analyst_industry}"
+    recommendation = f"Based on the data, sentiment analysis and industry analysis, write a short investment recommendation.\nAverage closing price: {avg_close}\nSentiment: {sentiment}\nAnalyst and Industry Analysis: {analyst_industry}"
     return recommendation
 
 # Streamlit UI
@@ -42,8 +71,8 @@ st.title("Investor Analysis Tool")
 ticker = st.text_input("Enter stock market ticker:")
 
 if ticker:
-    # Call Anthropic API to get industry and competitors
-    company_info = get_company_info(ticker)
+    # Call Anthropic API to get industry and competitors, and analyst analysis
+    company_info, analyst_industry = get_analyses(ticker)
     industry, competitors = company_info.split("\n")[0], company_info.split("\n")[1:6]
 
     # Display industry and competitors
@@ -52,14 +81,11 @@ if ticker:
 
     # Get historical data for all tickers
     tickers = [ticker] + competitors
-    data = yf.download(tickers, start=datetime.now() - timedelta(days=3*365), end=datetime.now())
+    close_prices = get_close_prices(tickers, start=(datetime.now() - timedelta(days=3*365)).date())
 
     # Plot closing prices
     st.subheader("Closing Prices")
-    for t in tickers:
-        plt.plot(data['Close'][t], label=t)
-    plt.legend()
-    st.pyplot()
+    st.image(get_chart_renderer().render('lines', close_prices[tickers]))
 
     # Add date range selector
     st.date_input("Select Date Range", [datetime.now() - timedelta(days=365), datetime.now()])
@@ -72,21 +98,15 @@ if ticker:
         import plotly.graph_objs as go
         from plotly.subplots import make_subplots
 
-        stock = yf.Ticker(selected_ticker)
-        hist = stock.history(period="1y")
+        hist = history_cache.get(selected_ticker, period="1y")
         fig = go.Figure(data=[go.Candlestick(x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'])])
         st.plotly_chart(fig)
 
     # Get news data and perform sentiment analysis
-    stock = yf.Ticker(ticker)
-    news = stock.news()
-    news_titles = [item['title'] for item in news]
-    sentiment = get_sentiment_analysis(news_titles)
-
-    # Get analyst rating and industry analysis
-    analyst_industry = get_analyst_industry_analysis(ticker)
+    sentiment = get_sentiment_analysis(get_news_titles(ticker))
+    st.dataframe(sentiment, hide_index=True)
 
-    # Generate recommendation
-    recommendation = generate_recommendation(data['Close'][ticker], sentiment, analyst_industry)
-    st.write(recommendation)
+    # Generate recommendation, shown as it is written
+    recommendation = generate_recommendation(close_prices[ticker], summarize(sentiment), analyst_industry)
+    st.write_stream(llm.stream(recommendation, max_tokens=400))
 
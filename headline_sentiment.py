@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from llm_cache import LLMClient
+from market_data import CACHE_DIR, DEFAULT_LLM_MODEL
+
+DEFAULT_SENTIMENT_PATH = os.path.join(CACHE_DIR, 'sentiment', 'scores.jsonl')
+LABELS = ('negative', 'neutral', 'positive')
+
+SCORING_PROMPT = (
+    "Score the sentiment of each news headline below for an investor, from -1 (very negative) "
+    "to 1 (very positive). Reply with only a JSON array holding one object per headline, "
+    'like [{{"id": 0, "score": 0.4, "label": "positive"}}], where label is one of negative, '
+    "neutral or positive.\n\n{headlines}"
+)
+
+
+# Headlines are matched on their text alone, so the same story scores once for every ticker it mentions
+def headline_key(headline, model=DEFAULT_LLM_MODEL):
+    return hashlib.sha1(f'{model}\n{" ".join(headline.split()).lower()}'.encode()).hexdigest()
+
+
+# The JSON array in a completion, ignoring any text around it
+def _parse_scores(text):
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        return []
+    try:
+        scores = json.loads(text[start:end + 1])
+    except ValueError:
+        return []
+    return [score for score in scores if isinstance(score, dict)]
+
+
+class SentimentStore:
+    """Per-headline sentiment scores, kept in a JSON-lines file shared by all sessions.
+
+    `score()` looks every headline up by hash and asks the model only
+    about the ones it has not seen, `batch_size` headlines per prompt with
+    the batches sent concurrently. Headlines the model skipped or scored
+    unreadably are left unscored, and their batch's reply is dropped from
+    the completion cache, so they are asked about again on the next call.
+    """
+
+    def __init__(self, path=DEFAULT_SENTIMENT_PATH, llm=None, model=DEFAULT_LLM_MODEL, batch_size=20):
+        self.path = path
+        self.llm = llm or LLMClient()
+        self.model = model
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._scores = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._scores[record['key']] = record
+
+    def _save(self, records):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, 'a') as f:
+            for record in records:
+                self._scores[record['key']] = record
+                f.write(json.dumps(record) + '\n')
+
+    def _score_new(self, headlines):
+        batches = [headlines[i:i + self.batch_size] for i in range(0, len(headlines), self.batch_size)]
+        prompts = [SCORING_PROMPT.format(headlines='\n'.join(f'{i}. {headline}' for i, headline in enumerate(batch)))
+                   for batch in batches]
+        max_tokens = 40 * self.batch_size
+        replies = self.llm.complete_many(prompts, max_tokens=max_tokens, model=self.model)
+        records = []
+        for batch, prompt, reply in zip(batches, prompts, replies):
+            scored = {}
+            for score in _parse_scores(reply):
+                try:
+                    i, value = int(score['id']), float(score['score'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not 0 <= i < len(batch):
+                    continue
+                label = score.get('label') if score.get('label') in LABELS else LABELS[(value > 0.1) - (value < -0.1) + 1]
+                scored[i] = {'key': headline_key(batch[i], self.model), 'headline': batch[i],
+                             'score': max(-1.0, min(1.0, value)), 'label': label}
+            records.extend(scored.values())
+            if len(scored) < len(batch):
+                # The completion cache would hand back this same reply for the same prompt; drop it so the
+                # headlines left unscored really are asked about again
+                self.llm.forget(prompt, max_tokens=max_tokens, model=self.model)
+        self._save(records)
+
+    def score(self, headlines):
+        """Headline, score and label for each distinct headline, scoring only unseen ones."""
+        headlines = list(dict.fromkeys(headline for headline in headlines if headline))
+        new = [headline for headline in headlines if headline_key(headline, self.model) not in self._scores]
+        if new:
+            self._score_new(new)
+        rows = [self._scores.get(headline_key(headline, self.model)) for headline in headlines]
+        return pd.DataFrame([{'headline': row['headline'], 'score': row['score'], 'label': row['label']}
+                             for row in rows if row is not None], columns=['headline', 'score', 'label'])
+
+
+# One-line summary of scored headlines for a prompt or the UI
+def summarize(scores):
+    if scores.empty:
+        return 'no scored headlines'
+    counts = scores['label'].value_counts()
+    return (f"mean score {scores['score'].mean():+.2f} over {len(scores)} headlines "
+            f"({counts.get('positive', 0)} positive, {counts.get('neutral', 0)} neutral, "
+            f"{counts.get('negative', 0)} negative)")
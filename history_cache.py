@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from market_data import get_provider
+
+# yfinance period strings resolved to a start offset from today ('max' means the full history)
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+# Default fetch: bars in [start, end) from the market data provider, full history when start is None
+def provider_fetch(ticker, start=None, end=None, interval='1d'):
+    if start is None and end is None:
+        return get_provider().history(ticker, period='max', interval=interval)
+    return get_provider().history(ticker, start=start, end=end, interval=interval)
+
+
+# Fetch backed by an OHLCVStore: daily bars come from disk, other intervals from the provider
+def store_fetch(store):
+    def fetch(ticker, start=None, end=None, interval='1d'):
+        if interval != '1d':
+            return provider_fetch(ticker, start, end, interval)
+        return _slice(store.history(ticker), start, end)
+    return fetch
+
+
+# Turn a period or start/end pair into a (start, end) range of naive day timestamps
+def resolve_range(period=None, start=None, end=None, now=None):
+    today = pd.Timestamp(now or datetime.now()).normalize()
+    if period is not None:
+        if period == 'max':
+            return None, None
+        if period == 'ytd':
+            return today.replace(month=1, day=1), None
+        return today - PERIOD_OFFSETS[period], None
+    start = pd.Timestamp(start).normalize() if start is not None else None
+    end = pd.Timestamp(end).normalize() if end is not None else None
+    return start, end
+
+
+def _localize(ts, index):
+    if ts is None:
+        return None
+    if getattr(index, 'tz', None) is not None and ts.tzinfo is None:
+        return ts.tz_localize(index.tz)
+    return ts
+
+
+def _slice(data, start, end):
+    if data.empty:
+        return data
+    start, end = _localize(start, data.index), _localize(end, data.index)
+    if start is not None:
+        data = data[data.index >= start]
+    if end is not None:
+        data = data[data.index < end]
+    return data
+
+
+# True if the cached range [outer_start, outer_end) contains [start, end); None means unbounded
+def _covers(outer_start, outer_end, start, end):
+    if outer_start is not None and (start is None or start < outer_start):
+        return False
+    if outer_end is not None and (end is None or end > outer_end):
+        return False
+    return True
+
+
+class HistoryCache:
+    """In-process price history cache shared by all sessions of an app.
+
+    Entries are keyed by (ticker, period or start/end, interval), expire after
+    `ttl` seconds and are evicted least-recently-used once their combined size
+    exceeds `max_bytes`. A request inside the range of a cached entry for the
+    same ticker and interval is sliced from it instead of being fetched.
+    """
+
+    def __init__(self, fetch=provider_fetch, ttl=15 * 60, max_bytes=256 * 1024 * 1024):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # key -> (fetched_at, start, end, data, nbytes), oldest use first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.slice_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, ticker, period=None, start=None, end=None, interval='1d'):
+        key = (ticker.upper(), period, str(start) if start is not None else None,
+               str(end) if end is not None else None, interval)
+        range_start, range_end = resolve_range(period, start, end)
+
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3].copy()
+
+            superset = self._find_superset(key[0], interval, range_start, range_end)
+            if superset is not None:
+                self.slice_hits += 1
+                return _slice(superset, range_start, range_end).copy()
+
+            self.misses += 1
+
+        # Fetch outside the lock so one slow ticker doesn't block cache reads for the others
+        data = self.fetch(ticker, range_start, range_end, interval)
+        data = _slice(data, range_start, range_end)
+        with self._lock:
+            self._put(key, range_start, range_end, data)
+        return data.copy()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.slice_hits + self.misses
+            return {
+                'hits': self.hits,
+                'slice_hits': self.slice_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.slice_hits) / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _find_superset(self, ticker, interval, start, end):
+        for key, (_, entry_start, entry_end, data, _) in reversed(self._entries.items()):
+            if key[0] == ticker and key[4] == interval and _covers(entry_start, entry_end, start, end):
+                self._entries.move_to_end(key)
+                return data
+        return None
+
+    def _put(self, key, start, end, data):
+        nbytes = int(data.memory_usage(deep=True).sum())
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[4]
+        self._entries[key] = (time.time(), start, end, data, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[4]
+            self.evictions += 1
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry[0] < cutoff]:
+            self._bytes -= self._entries.pop(key)[4]
@@ -0,0 +1,147 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from market_data import CACHE_DIR, DEFAULT_LLM_MODEL, get_provider
+
+DEFAULT_LLM_CACHE_DIR = os.path.join(CACHE_DIR, 'llm')
+
+
+# The session a completion is about: today on weekdays, otherwise the Friday before
+def trading_date(now=None):
+    return pd.offsets.BDay().rollback(pd.Timestamp(now or datetime.now()).normalize()).date()
+
+
+class LLMCache:
+    """Completions on disk, one JSON file per (model, prompt, max_tokens, trading date).
+
+    Entries older than `ttl` seconds are misses. When the files exceed
+    `max_bytes`, the least recently used ones are removed first (every hit
+    refreshes the file's modification time).
+    """
+
+    def __init__(self, root=DEFAULT_LLM_CACHE_DIR, ttl=24 * 3600, max_bytes=16 << 20):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(model, prompt, max_tokens, date):
+        return hashlib.sha1(json.dumps([model, prompt, max_tokens, str(date)]).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, f'{key}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry['created'] > self.ttl:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['text']
+
+    def put(self, key, text, **metadata):
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'created': time.time(), 'text': text, **metadata}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            now = time.time()
+            entries = []
+            for path in glob.glob(self._path('*')):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            # Expired entries go first, then the least recently used until the cache fits
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if total <= self.max_bytes and now - mtime <= self.ttl:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+class LLMClient:
+    """Cached completions through the market data provider, with independent prompts run concurrently.
+
+    Misses call `provider.complete()` on worker threads (at most
+    `max_concurrency` at once), so recording and replay keep working; the
+    live provider honours ANTHROPIC_BASE_URL, which can point it at a
+    local stub server.
+    """
+
+    def __init__(self, cache=None, provider=None, max_concurrency=4):
+        self.cache = cache or LLMCache()
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+
+    async def acomplete(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL, date=None, semaphore=None):
+        key = self.cache.key(model, prompt, max_tokens, date or trading_date())
+        text = self.cache.get(key)
+        if text is not None:
+            return text
+        provider = self.provider or get_provider()
+        async with semaphore or asyncio.Semaphore(1):
+            text = await asyncio.to_thread(provider.complete, prompt, max_tokens=max_tokens, model=model)
+        self.cache.put(key, text, model=model, prompt=prompt)
+        return text
+
+    async def acomplete_many(self, prompts, **kwargs):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self.acomplete(prompt, semaphore=semaphore, **kwargs) for prompt in prompts))
+
+    # Completions for every prompt, in order; blocks until the slowest one returns
+    def complete_many(self, prompts, **kwargs):
+        return asyncio.run(self.acomplete_many(list(prompts), **kwargs))
+
+    def complete(self, prompt, **kwargs):
+        return self.complete_many([prompt], **kwargs)[0]
+
+    # Drop a cached completion, e.g. one the caller could not use, so the next request asks the model again
+    def forget(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL, date=None):
+        self.cache.discard(self.cache.key(model, prompt, max_tokens, date or trading_date()))
+
+    # Text chunks as the model produces them, for st.write_stream; a cached answer is one chunk
+    def stream(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL, date=None):
+        key = self.cache.key(model, prompt, max_tokens, date or trading_date())
+        text = self.cache.get(key)
+        if text is not None:
+            yield text
+            return
+        chunks = []
+        for chunk in (self.provider or get_provider()).stream(prompt, max_tokens=max_tokens, model=model):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, ''.join(chunks), model=model, prompt=prompt)
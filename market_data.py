@@ -0,0 +1,274 @@
+import abc
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+import pandas as pd
+
+# Root of the apps' local caches (ignored by git); APP_CACHE_DIR points it elsewhere, e.g. for benchmarks
+CACHE_DIR = os.environ.get('APP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+DEFAULT_RECORDINGS_DIR = os.path.join(CACHE_DIR, 'recordings')
+DEFAULT_LLM_MODEL = os.environ.get('ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
+
+
+class MarketDataProvider(abc.ABC):
+    """Every call the apps make to a remote data service goes through one of these methods.
+
+    Subclasses must implement all of them except `stream()`; a provider
+    missing one cannot be instantiated.
+    """
+
+    # Bars for a ticker, like yf.Ticker(ticker).history(...)
+    @abc.abstractmethod
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        raise NotImplementedError
+
+    # Multi-ticker bars with (field, ticker) columns, like yf.download(...)
+    @abc.abstractmethod
+    def download(self, tickers, start=None, end=None, interval='1d'):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def news(self, ticker):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def info(self, ticker):
+        raise NotImplementedError
+
+    # Share count history ('Shares') and split ratios ('Split') on one date index
+    @abc.abstractmethod
+    def fundamentals(self, ticker):
+        raise NotImplementedError
+
+    # An OpenBB SDK call by dotted name, e.g. openbb('stocks.load', 'AAPL', source='Polygon')
+    @abc.abstractmethod
+    def openbb(self, name, *args, **kwargs):
+        raise NotImplementedError
+
+    # Text completion for a single user prompt
+    @abc.abstractmethod
+    def complete(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL):
+        raise NotImplementedError
+
+    # The same completion as successive text chunks; by default the whole completion as one chunk
+    def stream(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL):
+        yield self.complete(prompt, max_tokens=max_tokens, model=model)
+
+
+class LiveProvider(MarketDataProvider):
+    """Yahoo Finance, OpenBB and the Anthropic API."""
+
+    def __init__(self):
+        self._llm_client = None
+        self._llm_lock = threading.Lock()
+
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        import yfinance as yf
+
+        stock = yf.Ticker(ticker)
+        if start is None and end is None:
+            return stock.history(period=period or 'max', interval=interval)
+        return stock.history(start=start, end=end, interval=interval)
+
+    def download(self, tickers, start=None, end=None, interval='1d'):
+        import yfinance as yf
+
+        return yf.download(list(tickers), start=start, end=end, interval=interval,
+                           group_by='column', auto_adjust=True, threads=True, progress=False)
+
+    def news(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).news
+
+    def info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+    def fundamentals(self, ticker):
+        import yfinance as yf
+
+        stock = yf.Ticker(ticker)
+        shares = stock.get_shares_full(start='1990-01-01')
+        if shares is None or len(shares) == 0:
+            # Fall back to today's share count from the (much slower) info endpoint
+            shares_outstanding = stock.info.get('sharesOutstanding')
+            shares = pd.Series([shares_outstanding] if shares_outstanding else [],
+                               index=pd.DatetimeIndex([pd.Timestamp.now().normalize()] if shares_outstanding else []),
+                               dtype='float64')
+        splits = stock.splits
+        if shares.index.tz is not None:
+            shares = shares.tz_localize(None)
+        if splits.index.tz is not None:
+            splits = splits.tz_localize(None)
+        return pd.concat([shares.rename('Shares'), splits.rename('Split')], axis=1, sort=True)
+
+    def openbb(self, name, *args, **kwargs):
+        from openbb_terminal.sdk import openbb
+
+        function = openbb
+        for part in name.split('.'):
+            function = getattr(function, part)
+        return function(*args, **kwargs)
+
+    def complete(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL):
+        import anthropic
+
+        # Completions may be requested from several threads at once; they share one client
+        with self._llm_lock:
+            if self._llm_client is None:
+                # Reads ANTHROPIC_API_KEY (and ANTHROPIC_BASE_URL) from the environment
+                self._llm_client = anthropic.Anthropic()
+        response = self._llm_client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{'role': 'user', 'content': prompt}]
+        )
+        return ''.join(block.text for block in response.content if block.type == 'text')
+
+    def stream(self, prompt, max_tokens=150, model=DEFAULT_LLM_MODEL):
+        import anthropic
+
+        with self._llm_lock:
+            if self._llm_client is None:
+                self._llm_client = anthropic.Anthropic()
+        with self._llm_client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{'role': 'user', 'content': prompt}]
+        ) as stream:
+            yield from stream.text_stream
+
+
+# Methods that go through recording and replay
+PROVIDER_METHODS = ('history', 'download', 'news', 'info', 'fundamentals', 'openbb', 'complete')
+
+
+def _call_key(method, args, kwargs):
+    call = repr((method, args, sorted(kwargs.items())))
+    return hashlib.sha1(call.encode()).hexdigest(), call
+
+
+def _is_date(value):
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return True
+    return isinstance(value, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}([ T][\d:.]+)?', value) is not None
+
+
+# Recordings are looked up by the exact call first, then by the call with its dates blanked out, so calls
+# whose dates are relative to "today" still replay on later days. Every other argument stays in the key.
+def _loose_key(method, args, kwargs):
+    def blank(value):
+        if isinstance(value, list):
+            value = tuple(value)
+        return '<date>' if _is_date(value) else value
+
+    key, _ = _call_key(method, tuple(map(blank, args)), {name: blank(value) for name, value in kwargs.items()})
+    return key
+
+
+class RecordingProvider(MarketDataProvider):
+    """Forwards calls to `inner` and saves every response under `root` for ReplayProvider."""
+
+    def __init__(self, inner=None, root=DEFAULT_RECORDINGS_DIR):
+        self.inner = inner or LiveProvider()
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _record(self, method, args, kwargs):
+        result = getattr(self.inner, method)(*args, **kwargs)
+        key, call = _call_key(method, args, kwargs)
+        payload = pickle.dumps(result)
+        for name in (key, _loose_key(method, args, kwargs)):
+            path = os.path.join(self.root, f'{name}.pkl')
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        # Human-readable list of what was recorded
+        with self._lock, open(os.path.join(self.root, 'calls.jsonl'), 'a') as f:
+            f.write(json.dumps({'key': key, 'call': call}) + '\n')
+        return result
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves responses saved by RecordingProvider, sleeping `latency` seconds per call.
+
+    `latency` may be a number or a dict of per-method latencies, e.g.
+    {'history': 0.2, 'complete': 1.5}. Calls that were never recorded raise
+    LookupError.
+    """
+
+    def __init__(self, root=DEFAULT_RECORDINGS_DIR, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self.calls = 0
+
+    def _replay(self, method, args, kwargs):
+        latency = self.latency.get(method, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            time.sleep(latency)
+        self.calls += 1
+        key, call = _call_key(method, args, kwargs)
+        for name in (key, _loose_key(method, args, kwargs)):
+            path = os.path.join(self.root, f'{name}.pkl')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+        raise LookupError(f'No recording for {call} in {self.root}')
+
+
+# Each provider method of RecordingProvider / ReplayProvider forwards to its _record / _replay handler
+def _dispatch(method, handler):
+    def call(self, *args, **kwargs):
+        return getattr(self, handler)(method, args, kwargs)
+    call.__name__ = method
+    return call
+
+
+for _method in PROVIDER_METHODS:
+    setattr(RecordingProvider, _method, _dispatch(_method, '_record'))
+    setattr(ReplayProvider, _method, _dispatch(_method, '_replay'))
+# The methods were added after the classes were created, so recompute which ones are still abstract
+abc.update_abstractmethods(RecordingProvider)
+abc.update_abstractmethods(ReplayProvider)
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The process-wide provider, chosen by the MARKET_DATA_MODE environment variable.
+
+    live (default) calls the real services, record also saves every
+    response to MARKET_DATA_DIR, and replay serves those recordings offline
+    with MARKET_DATA_LATENCY seconds of simulated latency per call.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            mode = os.environ.get('MARKET_DATA_MODE', 'live')
+            root = os.environ.get('MARKET_DATA_DIR', DEFAULT_RECORDINGS_DIR)
+            if mode == 'record':
+                _provider = RecordingProvider(LiveProvider(), root)
+            elif mode == 'replay':
+                _provider = ReplayProvider(root, float(os.environ.get('MARKET_DATA_LATENCY', '0')))
+            elif mode == 'live':
+                _provider = LiveProvider()
+            else:
+                raise ValueError(f'Unknown MARKET_DATA_MODE {mode!r}; use live, record or replay')
+        return _provider
+
+
+def set_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ohlcv_store import OHLCV_COLUMNS
+
+# Resampling intervals offered by the candlestick selectbox, as pandas period frequencies
+RESOLUTIONS = {'D': None, 'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+
+
+# Aggregate daily bars into one bar per period with vectorized first/max/min/last/sum kernels.
+# Bars must be sorted by date; each bucket is labelled with its period's last day, like resample().
+def aggregate_bars(daily, freq):
+    if daily.empty:
+        return daily[OHLCV_COLUMNS].iloc[:0]
+    index = daily.index
+    naive = index.tz_localize(None) if index.tz is not None else index
+    periods = naive.to_period(freq)
+    codes = periods.asi8
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)] - 1
+
+    labels = periods[starts].to_timestamp(how='end').normalize()
+    if index.tz is not None:
+        labels = labels.tz_localize(index.tz)
+    return pd.DataFrame({
+        'Open': daily['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(daily['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(daily['Low'].to_numpy(), starts),
+        'Close': daily['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(daily['Volume'].to_numpy(), starts),
+    }, index=pd.DatetimeIndex(labels, name=index.name))
+
+
+class OHLCVPyramid:
+    """Day, week, month, quarter and year OHLCV bars for one ticker, built once.
+
+    `update(daily)` takes the latest daily history; when it only adds or
+    revises bars at the end, just the last bucket of each level is
+    re-aggregated. `level(resolution)` is then a dictionary lookup.
+    """
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = dict(resolutions)
+        self.levels = {}
+        self.daily = None
+        self._lock = threading.Lock()
+
+    def level(self, resolution):
+        return self.levels[resolution]
+
+    def update(self, daily):
+        daily = daily[OHLCV_COLUMNS].dropna()
+        with self._lock:
+            start = self._first_changed_bar(daily)
+            if start is None:
+                return self
+            if start == 0:
+                self.levels = {resolution: daily if freq is None else aggregate_bars(daily, freq)
+                               for resolution, freq in self.resolutions.items()}
+            else:
+                self._update_tail(daily, start)
+            self.daily = daily
+        return self
+
+    # Position of the first daily bar that differs from what the pyramid was built from,
+    # None if nothing changed and 0 if the history was rewritten (e.g. split adjustment)
+    def _first_changed_bar(self, daily):
+        old = self.daily
+        if old is None or old.empty or len(daily) < len(old):
+            return 0
+        n = len(old) - 1
+        new_values, old_values = daily.to_numpy(), old.to_numpy()
+        if not daily.index[:n].equals(old.index[:n]) or \
+                not np.array_equal(new_values[:n], old_values[:n], equal_nan=True):
+            return 0
+        if len(daily) == len(old) and daily.index[n] == old.index[n] and \
+                np.array_equal(new_values[n], old_values[n], equal_nan=True):
+            return None
+        return n
+
+    def _update_tail(self, daily, start):
+        for resolution, freq in self.resolutions.items():
+            if freq is None:
+                self.levels[resolution] = daily
+                continue
+            # Re-aggregate from the start of the bucket holding the first changed bar;
+            # earlier buckets are labelled with period ends before that start and are kept
+            first_changed = daily.index[start]
+            bucket_start = _naive(first_changed).to_period(freq).start_time
+            if first_changed.tzinfo is not None:
+                bucket_start = bucket_start.tz_localize(first_changed.tzinfo)
+            bars = self.levels[resolution]
+            keep = bars.iloc[:bars.index.searchsorted(bucket_start)]
+            tail = daily.iloc[daily.index.searchsorted(bucket_start):]
+            self.levels[resolution] = pd.concat([keep, aggregate_bars(tail, freq)])
+
+
+def _naive(timestamp):
+    return timestamp.tz_localize(None) if timestamp.tzinfo is not None else timestamp
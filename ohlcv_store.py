@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from market_data import CACHE_DIR, get_provider
+
+# Columns kept in the store, in the order the charts expect them
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Parquet files, one per ticker
+DEFAULT_STORE_DIR = os.path.join(CACHE_DIR, 'ohlcv')
+
+
+# Default data source: daily bars from the market data provider, full history when start is None
+def provider_history(ticker, start=None):
+    if start is None:
+        return get_provider().history(ticker, period='max')
+    return get_provider().history(ticker, start=start)
+
+
+class OHLCVStore:
+    """On-disk Parquet store of daily OHLCV history, one file per ticker.
+
+    `source(ticker, start)` returns a DataFrame of bars from `start` onwards
+    (or the full history when `start` is None). Only bars after the last
+    stored date are requested; a local stand-in source can be passed to use
+    the store offline.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, source=provider_history, refresh_interval=15 * 60):
+        self.root = root
+        self.source = source
+        # Seconds during which a stored ticker is served without asking the source for new bars
+        self.refresh_interval = refresh_interval
+        # Streamlit sessions share one store; updates of the same ticker are serialized so two reruns
+        # don't fetch the same bars, while different tickers refresh in parallel
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, ticker):
+        safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in ticker.upper())
+        return os.path.join(self.root, f'{safe_name}.parquet')
+
+    def _ticker_lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(self.path(ticker), threading.Lock())
+
+    # Read the stored history for a ticker without touching the source
+    def read(self, ticker):
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return pd.read_parquet(path)
+
+    # Full history for a ticker, appending any bars newer than the last stored date
+    def history(self, ticker, refresh=None):
+        if refresh or (refresh is None and self._stale(ticker)):
+            with self._ticker_lock(ticker):
+                # Another caller may have refreshed the ticker while this one waited for the lock
+                if refresh or self._stale(ticker):
+                    return self.update(ticker)
+        return self.read(ticker)
+
+    def _stale(self, ticker):
+        path = self.path(ticker)
+        try:
+            return time.time() - os.path.getmtime(path) > self.refresh_interval
+        except OSError:
+            return True
+
+    def update(self, ticker):
+        stored = self.read(ticker)
+        if stored.empty:
+            fresh = self._normalize(self.source(ticker, None))
+            if not fresh.empty:
+                self._write(ticker, fresh)
+            return fresh
+
+        # Re-request the last stored bar as well: it may have been a partial (intraday) bar,
+        # and comparing it tells us whether the source has re-adjusted past prices
+        last_date = stored.index[-1]
+        new_bars = self._normalize(self.source(ticker, last_date.date()))
+        new_bars = new_bars[new_bars.index >= last_date]
+
+        if new_bars.empty:
+            os.utime(self.path(ticker))
+            return stored
+
+        if self._adjusted_since(stored, new_bars):
+            # A split or dividend adjustment changed past prices: rebuild the whole history
+            fresh = self._normalize(self.source(ticker, None))
+            self._write(ticker, fresh)
+            return fresh
+
+        combined = pd.concat([stored[stored.index < new_bars.index[0]], new_bars])
+        self._write(ticker, combined)
+        return combined
+
+    def _adjusted_since(self, stored, new_bars):
+        last_date = stored.index[-1]
+        if new_bars.index[0] != last_date:
+            return False
+        # The last stored bar may still have been trading; compare its open, which is final
+        stored_open = stored['Open'].iloc[-1]
+        new_open = new_bars['Open'].iloc[0]
+        return abs(stored_open - new_open) > 1e-6 * max(abs(stored_open), 1.0)
+
+    def _normalize(self, data):
+        if data is None or data.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        data = data[[col for col in OHLCV_COLUMNS if col in data.columns]].copy()
+        data.index = pd.to_datetime(data.index)
+        data.index.name = 'Date'
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        return data.astype({'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64', 'Volume': 'float64'})
+
+    def _write(self, ticker, data):
+        # Write to a temporary file first so readers never see a half-written Parquet file
+        path = self.path(ticker)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
@@ -0,0 +1,126 @@
+import operator
+import os
+import threading
+from functools import reduce
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from cycle_time_data import SCHEMA, apply_schema, dataset_key, iter_cycle_times
+from market_data import CACHE_DIR
+
+DEFAULT_HISTORY_DIR = os.path.join(CACHE_DIR, 'plant_history')
+
+# Directory layout: year=2023/month=4/MATERIAL=PRODUCT%20C/<file>.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([('year', pa.int16()), ('month', pa.int8()), ('MATERIAL', pa.string())]),
+    flavor='hive',
+)
+PARTITION_COLUMNS = ['year', 'month']
+
+
+def _to_table(chunk):
+    times = chunk['END TIME']
+    chunk = chunk.assign(year=times.dt.year.astype('int16'), month=times.dt.month.astype('int8'))
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    # Store categories as plain strings (Parquet dictionary-encodes them anyway) so every file has one schema
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+
+def _timestamp(value):
+    return pa.scalar(pd.Timestamp(value).as_unit('ns').to_datetime64(), type=pa.timestamp('ns'))
+
+
+# Filter whose year/month terms prune partitions and whose END TIME terms prune row groups
+def _filter(materials, start, end):
+    year, month = pc.field('year'), pc.field('month')
+    conditions = []
+    if materials is not None:
+        conditions.append(pc.field('MATERIAL').isin([str(material) for material in materials]))
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions.append((year > start.year) | ((year == start.year) & (month >= start.month)))
+        conditions.append(pc.field('END TIME') >= _timestamp(start))
+    if end is not None:
+        last = pd.Timestamp(end) - pd.Timedelta(1, 'ns')
+        conditions.append((year < last.year) | ((year == last.year) & (month <= last.month)))
+        conditions.append(pc.field('END TIME') < _timestamp(end))
+    return reduce(operator.and_, conditions) if conditions else None
+
+
+class PlantHistory:
+    """Cycle-time history as a Parquet dataset partitioned by year, month and material.
+
+    `ingest()` appends a file's rows once (files are tracked by content
+    hash), and `query()` pushes material and END TIME filters down to the
+    dataset, so only the partitions and row groups a view needs are read.
+    """
+
+    def __init__(self, root=DEFAULT_HISTORY_DIR):
+        self.root = root
+        self._dataset = None
+        self._lock = threading.Lock()
+
+    # Content hashes of ingested files; the leading underscore keeps it out of the dataset
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, '_ingested')
+
+    def ingested(self):
+        if not os.path.exists(self.manifest_path):
+            return set()
+        with open(self.manifest_path) as f:
+            return set(f.read().split())
+
+    def ingest(self, source):
+        key = dataset_key(source)
+        with self._lock:
+            if key in self.ingested():
+                return False
+            # File names derive from the content hash, so an interrupted ingest is overwritten on retry
+            for i, (chunk, _) in enumerate(iter_cycle_times(source)):
+                ds.write_dataset(_to_table(chunk), self.root, format='parquet', partitioning=PARTITIONING,
+                                 basename_template=f'{key}-{i}-{{i}}.parquet',
+                                 existing_data_behavior='overwrite_or_ignore')
+            with open(self.manifest_path, 'a') as f:
+                f.write(f'{key}\n')
+            self._dataset = None
+        return True
+
+    def dataset(self):
+        with self._lock:
+            if self._dataset is None and os.path.isdir(self.root):
+                self._dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+            return self._dataset
+
+    def query(self, materials=None, start=None, end=None, columns=None):
+        """Typed rows for `materials` (default all) with END TIME in [start, end)."""
+        dataset = self.dataset()
+        if dataset is None:
+            return apply_schema(pd.DataFrame(columns=columns or list(SCHEMA)))
+        table = dataset.to_table(columns=columns, filter=_filter(materials, start, end))
+        data = table.drop_columns([name for name in PARTITION_COLUMNS if name in table.column_names]).to_pandas()
+        return apply_schema(data)
+
+    def _partitions(self):
+        dataset = self.dataset()
+        if dataset is None:
+            return []
+        return [ds.get_partition_keys(fragment.partition_expression) for fragment in dataset.get_fragments()]
+
+    # Listed from the directory names alone, without reading any rows
+    def materials(self):
+        return sorted({keys['MATERIAL'] for keys in self._partitions()})
+
+    # First day of the earliest month and last day of the latest month on disk
+    def date_bounds(self):
+        months = sorted({(keys['year'], keys['month']) for keys in self._partitions()})
+        if not months:
+            return None, None
+        first, last = pd.Timestamp(*months[0], 1), pd.Timestamp(*months[-1], 1) + pd.offsets.MonthEnd()
+        return first.date(), last.date()
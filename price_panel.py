@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from market_data import get_provider
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class PricePanel:
+    """Dense ticker × date × field array of OHLCV data on one shared trading calendar.
+
+    `values` is a single C-contiguous float32 array; dates a ticker did not
+    trade are NaN. `ticker()` and `field()` return views into it, so charts
+    can slice the panel without copying.
+    """
+
+    def __init__(self, tickers, dates, values):
+        self.tickers = list(tickers)
+        self.dates = pd.DatetimeIndex(dates)
+        self.values = values
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    # (dates × fields) frame for one ticker, backed by the panel's memory
+    def ticker(self, ticker):
+        view = self.values[self._positions[ticker]]
+        return pd.DataFrame(view, index=self.dates, columns=list(FIELDS), copy=False)
+
+    # (tickers × dates) array of one field, e.g. all closing prices
+    def field(self, name):
+        return self.values[:, :, FIELDS.index(name)]
+
+    @classmethod
+    def from_frame(cls, frame, tickers):
+        # Accept yfinance's multi-ticker layout: columns are (field, ticker) pairs
+        if not isinstance(frame.columns, pd.MultiIndex):
+            frame = pd.concat({tickers[0]: frame}, axis=1).swaplevel(axis=1)
+        columns = pd.MultiIndex.from_product([FIELDS, tickers])
+        frame = frame.reindex(columns=columns)
+        dates = pd.to_datetime(frame.index)
+        # (dates, fields * tickers) -> (tickers, dates, fields)
+        values = frame.to_numpy(dtype=np.float32).reshape(len(dates), len(FIELDS), len(tickers))
+        values = np.ascontiguousarray(values.transpose(2, 0, 1))
+        return cls(tickers, dates, values)
+
+
+# One multi-ticker request for all tickers, aligned on the union of their trading dates
+def load_panel(tickers, start, end):
+    tickers = list(tickers)
+    frame = get_provider().download(tickers, start=start, end=end)
+    return PricePanel.from_frame(frame, tickers)
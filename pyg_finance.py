@@ -7,15 +7,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 import altair as alt
 import yfinance as yf
-from pygwalker.api.streamlit import StreamlitRenderer
 import streamlit as st
+from market_data import get_provider
+from pyg_renderer import get_renderer
+from watchlist_scheduler import get_scheduler, latest, refresh_cached
 
-def get_stock_data(ticker, years):
+# `generation` is bumped by the watchlist refresh once it has newer bars
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_stock_data(ticker, years, generation=0):
     end_date = datetime.datetime.now()
     start_date = end_date - datetime.timedelta(days=years*365)
-    stock = yf.Ticker(ticker)
     # Retrieve historical price data
-    hist_data = stock.history(start=start_date, end=end_date)
+    hist_data = get_provider().history(ticker, start=start_date, end=end_date)
     return hist_data
  
 # Adjust the width of the Streamlit page
@@ -26,10 +29,20 @@ st.set_page_config(
 # Import your data
 tickers = ["MSFT", "NVDA", "ANET", "TSLA", "GFS"]
 years =  3
+
+# Refreshed in the background at startup, every 45 minutes and after the market close
+def refresh_watchlist():
+    refresh_cached(get_stock_data, [(ticker, years) for ticker in tickers])
+
+scheduler = get_scheduler()
+scheduler.register('pyg_finance watchlist', refresh_watchlist)
+with st.sidebar.expander("Data refresh"):
+    st.dataframe(scheduler.metrics(['pyg_finance watchlist']), hide_index=True)
+
 hist = pd.DataFrame()
 first = 0
 for ticker in tickers:
-    data = get_stock_data(ticker, 3)
+    data = latest(get_stock_data, ticker, years)
     data['date'] = data.index
     data['ticker'] = ticker
     if first == 0:
@@ -41,7 +54,7 @@ for ticker in tickers:
           
 hist['daily change'] = (hist.Close - hist.Open)/hist.Open
 hist['volatility'] = (hist.High - hist.Low)/hist.Open
-pyg_app = StreamlitRenderer(hist)
+pyg_app = get_renderer(hist)
  
 pyg_app.explorer()
 
@@ -1,107 +1,166 @@
-import streamlit as st 
-from openbb_terminal.sdk import openbb
-import pandas as pd
+import streamlit as st
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from market_data import get_provider
+from watchlist_scheduler import get_scheduler, latest, refresh_cached
 import plotly.graph_objects as go
 
 st.set_page_config(layout="wide")
 
-st.header("Custom Dashboard using OpenBB")
+provider = get_provider()
 
-tab1, tab3, tab4, tab5 = st.tabs(["Stocks", "Forex", "Economic Index", "ETF"])
+TABS = ["Stocks", "Forex", "Economic Index", "ETF"]
+STOCKS = ('AAPL', 'TSLA', 'AMZN', 'AMD', 'META', 'GM', 'NVDA', 'QQQ', 'MSFT', 'GOOG', 'GOOGL', 'F')
 
-with tab1:    
-    choice = st.selectbox(
-        label = "Choose a Stock Ticker.",
-        options = ('AAPL', 'TSLA', 'AMZN', 'AMD', 'META', 'GM', 'NVDA', 'QQQ', 'MSFT', 'GOOG', 'GOOGL', 'F')
-    )
-    
-    
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        df = openbb.stocks.load(choice, source = 'Polygon')
-        st.write("Data for " + str(choice) + " Stock Price")
-        st.write(df)
-
-    with col2:
-        st.write("Chart for " + str(choice) + " Closing Price")
-        fig = go.Figure(
-            data = [
-                go.Candlestick(
-                    open = df['Open'],
-                    high = df['High'],
-                    low = df['Low'],
-                    close = df['Close']
-                )
-            ]
-        )
-
-        st.write(fig)
-    
-with tab3:
-    currencies = tuple(openbb.forex.get_currency_list())
-    from_sym = st.selectbox(
-        label = "Choose a Currency.",
-        options = (currencies),
-        index = currencies.index('USD')
-    )
-    to_sym = st.selectbox(
-        label = "Choose a second Currency.",
-        options = (currencies),
-        index = currencies.index('EUR')
-    )
-    
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.write("Data for " + str(from_sym) + "-" + str(to_sym) + " price")
-        df3 = openbb.forex.load(from_symbol = from_sym, to_symbol = to_sym, source = "Polygon")
-
-        st.write(df3)
-
-    with col2:
-        st.write("Chart for " + str(from_sym) + "-" + str(to_sym) + " Price")
-        fig3 = go.Figure(
-            data = [
-                go.Candlestick(
-                    open = df3['Open'],
-                    high = df3['High'],
-                    low = df3['Low'],
-                    close = df3['Close']
-                )
-            ]
-        )
-        st.write(fig3)
-
-with tab4:
-    st.write("Data for Top US Economic Indices")
-    st.write(openbb.economy.indices())
-
-with tab5:
-    etfs = tuple(openbb.etf.symbols()[0])
-    choice5 = st.selectbox(
-        label = "Choose an ETF to load.",
-        options = (etfs)
+# One cache per tab loader, shared by all sessions; lists change rarely, prices hourly. `generation` is
+# bumped by the watchlist refresh once it has a newer value, so call these through latest()
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_stock(symbol, generation=0):
+    return provider.openbb('stocks.load', symbol, source = 'Polygon')
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def currency_list(generation=0):
+    return tuple(provider.openbb('forex.get_currency_list'))
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_forex(from_sym, to_sym, generation=0):
+    return provider.openbb('forex.load', from_symbol = from_sym, to_symbol = to_sym, source = "Polygon")
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def economic_indices(generation=0):
+    return provider.openbb('economy.indices')
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def etf_symbols(generation=0):
+    return tuple(provider.openbb('etf.symbols')[0])
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_etf(symbol, generation=0):
+    return provider.openbb('etf.load', symbol = f"{symbol}", source = "Polygon")
+
+# Loads a tab needs for its current (or default) selections; run on a worker thread, so no Streamlit calls
+def prefetch_tab(tab, saved):
+    if tab == "Stocks":
+        latest(load_stock, saved.get('stock', STOCKS[0]))
+    elif tab == "Forex":
+        latest(currency_list)
+        latest(load_forex, saved.get('from_sym', 'USD'), saved.get('to_sym', 'EUR'))
+    elif tab == "Economic Index":
+        latest(economic_indices)
+    elif tab == "ETF":
+        latest(load_etf, saved.get('etf') or latest(etf_symbols)[0])
+
+# The watchlist, the default forex pair and ETF and the reference lists, refreshed in the background
+def refresh_watchlist():
+    refresh_cached(load_stock, [(symbol,) for symbol in STOCKS])
+    for loader in (currency_list, economic_indices, etf_symbols):
+        refresh_cached(loader, [()])
+    refresh_cached(load_forex, [('USD', 'EUR')])
+    refresh_cached(load_etf, [(latest(etf_symbols)[0],)])
+
+scheduler = get_scheduler()
+scheduler.register('pyg_finance2 watchlist', refresh_watchlist)
+
+# Prefetch pool shared by all sessions, with the pending prefetch of each tab
+@st.cache_resource
+def get_prefetcher():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='tab-prefetch'), {}, threading.Lock()
+
+# Queue a prefetch of `tab` unless one is already pending, so reruns don't pile up duplicate tasks
+def prefetch_neighbour(tab, saved):
+    pool, pending, lock = get_prefetcher()
+    with lock:
+        future = pending.get(tab)
+        if future is None or future.done():
+            pending[tab] = pool.submit(prefetch_tab, tab, saved)
+
+# Widget state is dropped while its tab is closed, so each choice is also kept under a plain key
+def remembered_selectbox(label, options, key, default=0):
+    saved = st.session_state.get(f'saved_{key}')
+    value = st.selectbox(label = label, options = options, index = options.index(saved) if saved in options else default, key = key)
+    st.session_state[f'saved_{key}'] = value
+    return value
+
+def candlestick(df):
+    return go.Figure(
+        data = [
+            go.Candlestick(
+                open = df['Open'],
+                high = df['High'],
+                low = df['Low'],
+                close = df['Close']
+            )
+        ]
     )
-    
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.write("Data for " + str(choice5) + " ETF Price")
-        df5 = openbb.etf.load(symbol = f"{choice5}", source = "Polygon")
-    
-        st.write(df5)
-    with col2:
-        st.write("Candle Chart for " + str(choice5) + " ETF Price")
-        fig4 = go.Figure(
-            data = [
-                go.Candlestick(
-                    open = df5['Open'],
-                    high = df5['High'],
-                    low = df5['Low'],
-                    close = df5['Close']
-                )
-            ]
-        )
-        st.write(fig4)
+
+st.header("Custom Dashboard using OpenBB")
+
+prefetch = st.sidebar.toggle("Prefetch neighbouring tabs", value = True)
+with st.sidebar.expander("Data refresh"):
+    st.dataframe(scheduler.metrics(['pyg_finance2 watchlist']), hide_index = True)
+
+# Only the open tab's body runs; switching tabs reruns the script
+tabs = st.tabs(TABS, key = "tab", on_change = "rerun")
+tab1, tab3, tab4, tab5 = tabs
+
+if tab1.open:
+    with tab1:
+        choice = remembered_selectbox("Choose a Stock Ticker.", STOCKS, 'stock')
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            df = latest(load_stock, choice)
+            st.write("Data for " + str(choice) + " Stock Price")
+            st.write(df)
+
+        with col2:
+            st.write("Chart for " + str(choice) + " Closing Price")
+            st.write(candlestick(df))
+
+if tab3.open:
+    with tab3:
+        currencies = latest(currency_list)
+        from_sym = remembered_selectbox("Choose a Currency.", currencies, 'from_sym', currencies.index('USD'))
+        to_sym = remembered_selectbox("Choose a second Currency.", currencies, 'to_sym', currencies.index('EUR'))
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.write("Data for " + str(from_sym) + "-" + str(to_sym) + " price")
+            df3 = latest(load_forex, from_sym, to_sym)
+
+            st.write(df3)
+
+        with col2:
+            st.write("Chart for " + str(from_sym) + "-" + str(to_sym) + " Price")
+            st.write(candlestick(df3))
+
+if tab4.open:
+    with tab4:
+        st.write("Data for Top US Economic Indices")
+        st.write(latest(economic_indices))
+
+if tab5.open:
+    with tab5:
+        etfs = latest(etf_symbols)
+        choice5 = remembered_selectbox("Choose an ETF to load.", etfs, 'etf')
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.write("Data for " + str(choice5) + " ETF Price")
+            df5 = latest(load_etf, choice5)
+
+            st.write(df5)
+        with col2:
+            st.write("Candle Chart for " + str(choice5) + " ETF Price")
+            st.write(candlestick(df5))
+
+# Warm the caches of the tabs either side of the open one, so switching to them is a cache hit
+if prefetch:
+    active = next((i for i, tab in enumerate(tabs) if tab.open), 0)
+    saved = {key[len('saved_'):]: value for key, value in st.session_state.items() if key.startswith('saved_')}
+    for i in (active - 1, active + 1):
+        if 0 <= i < len(TABS):
+            prefetch_neighbour(TABS[i], saved)
@@ -0,0 +1,20 @@
+from pygwalker.api.streamlit import StreamlitRenderer
+import streamlit as st
+
+from figure_cache import fingerprint
+
+
+# Renderers hold the frame in pygwalker's DuckDB kernel; explorer queries run there as SQL and only
+# their aggregated results are sent to the browser, instead of the whole frame on every rerun
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _renderer(key, _df, spec):
+    return StreamlitRenderer(_df, spec=spec, kernel_computation=True)
+
+
+def get_renderer(df, key=None, spec=''):
+    """PyGWalker renderer for `df` with kernel computation, shared across reruns and sessions.
+
+    Renderers are cached per `key`, or per a hash of the frame's content
+    when no key is given, so an unchanged dataset reuses its kernel.
+    """
+    return _renderer(key or fingerprint(df), df, spec)
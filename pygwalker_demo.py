@@ -1,15 +1,28 @@
-from pygwalker.api.streamlit import StreamlitRenderer
 import pandas as pd
 import streamlit as st
+from plant_history import PlantHistory
+from pyg_renderer import get_renderer
+from time_buckets import period_labels
  
 # Adjust the width of the Streamlit page
 st.set_page_config(
     page_title="Use Pygwalker In Streamlit",
     layout="wide"
 )
-# Import your data
-df = pd.read_excel("Plant cycle time Data.xlsx")
-df['graphmonth'] = df['END TIME'].dt.strftime('%Y-%m') 
-pyg_app = StreamlitRenderer(df)
+# Import your data into the partitioned plant history (once), then read only the selected slice
+@st.cache_resource
+def get_history():
+    history = PlantHistory()
+    history.ingest("Plant cycle time Data.xlsx")
+    return history
+
+history = get_history()
+first, last = history.date_bounds()
+materials = st.sidebar.multiselect("Materials", history.materials(), default=history.materials())
+dates = st.sidebar.date_input("Date range", (first, last), min_value=first, max_value=last)
+start, end = (dates[0], dates[-1]) if dates else (first, last)
+df = history.query(materials=materials, start=start, end=pd.Timestamp(end) + pd.Timedelta(days=1))
+df['graphmonth'] = period_labels(df['END TIME'], 'month')
+pyg_app = get_renderer(df, key=('plant history', tuple(materials), start, end))
  
 pyg_app.explorer()
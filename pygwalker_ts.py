@@ -1,7 +1,9 @@
-from pygwalker.api.streamlit import StreamlitRenderer
+import os
 import pandas as pd
 import numpy as np
 import streamlit as st
+from pyg_renderer import get_renderer
+from rollup_store import DEFAULT_ROLLUP_DIR, RollupStore
  
 # Adjust the width of the Streamlit page
 st.set_page_config(
@@ -20,11 +22,23 @@ np.random.seed(0)
 # weekly_df['sales'] = df['sales'].resample('H').sum()
 # weekly_df['TS'] = weekly_df.index
 # Import your data
-df = pd.read_excel("timeseries.xlsx")
-df.set_index('TS', inplace=True)
-df_minute = pd.DataFrame()
-df_minute['RAW_VALUE'] = df['RAW_VALUE'].resample('D').sum()
+# Raw samples are ingested once; every view after that reads one rollup resolution
+@st.cache_resource
+def get_store():
+    store = RollupStore(os.path.join(DEFAULT_ROLLUP_DIR, 'timeseries'))
+    store.ingest("timeseries.xlsx")
+    return store
+
+store = get_store()
+resolution = st.sidebar.radio("Resolution", ('day', 'hour', 'minute'))
+rollup = store.query(resolution)
+df_minute = pd.DataFrame({
+    'RAW_VALUE': rollup['sum'],
+    'SAMPLES': rollup['count'],
+    'MIN_VALUE': rollup['min'],
+    'MAX_VALUE': rollup['max'],
+})
 df_minute['TS'] = df_minute.index
-pyg_app = StreamlitRenderer(df_minute)
+pyg_app = get_renderer(df_minute, key=('timeseries', resolution))
  
 pyg_app.explorer()
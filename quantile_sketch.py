@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """KLL quantile sketch: a fixed-size, mergeable summary of a stream of numbers.
+
+    Up to `k` values are kept exactly; beyond that, full levels are sorted
+    and every other item is promoted with double the weight. Rank error is
+    about 1.7 / k, and two sketches of disjoint rows merge into a sketch of
+    their union, so per-week sketches can be rolled up into months.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels = [np.empty(0)]
+        self.seed = seed
+        # Only needed once the sketch starts compacting
+        self._rng = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        merged = QuantileSketch(self.k, self.seed)
+        merged.n = self.n + other.n
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        depth = max(len(self.levels), len(other.levels))
+        merged.levels = [np.concatenate([sketch.levels[h] for sketch in (self, other) if h < len(sketch.levels)])
+                         for h in range(depth)]
+        merged._compress()
+        return merged
+
+    # Items per level shrink geometrically below the top level
+    def _capacity(self, level):
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if self._rng is None:
+                    self._rng = np.random.default_rng(self.seed)
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind; the rest are halved from a random offset
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    # Retained values (sorted) and the number of rows each one stands for
+    def items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        values, weights = self.items()
+        # Each item sits at the middle of the ranks it stands for; unweighted this is numpy's 'linear'
+        ranks = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(np.asarray(q, dtype='float64') * (weights.sum() - 1), ranks, values)
+
+
+# Tukey box for one sketch: quartiles, whiskers at the furthest values within 1.5 IQR, and
+# the values beyond them (all of them while the sketch is exact, a weighted sample after that)
+def box_stats(sketch):
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    values, _ = sketch.items()
+    low_fence, high_fence = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = values[(values >= low_fence) & (values <= high_fence)]
+    outliers = values[(values < low_fence) | (values > high_fence)]
+    stats = dict(count=sketch.n, lower=inside.min(), q1=q1, median=median, q3=q3, upper=inside.max())
+    return stats, outliers
+
+
+# Vega-Lite box plot of precomputed box statistics, so only a handful of numbers per box reach the browser.
+# Each box is sent as its five values (whisker, quartiles, whisker): Vega-Lite's own quartiles of
+# five points are exactly the middle three, and extent='min-max' puts the whiskers on the ends.
+# The spec is built as a plain dict; Altair's per-layer validation cost more than the data it replaces.
+def boxplot_spec(stats, outliers, x, y_title='Cycle Time (days)', x_title=None, **properties):
+    points = stats.melt(id_vars=[x], value_vars=['lower', 'q1', 'median', 'q3', 'upper'], value_name='value')
+    encoding = {
+        'x': {'field': x, 'type': 'nominal', 'title': x_title or x},
+        'y': {'field': 'value', 'type': 'quantitative', 'title': y_title},
+    }
+    # Named datasets are sent by Streamlit as Arrow tables instead of JSON records inside the spec
+    datasets = {'boxes': points[[x, 'value']]}
+    layers = [{
+        'data': {'name': 'boxes'},
+        'mark': {'type': 'boxplot', 'extent': 'min-max'},
+        'encoding': encoding,
+    }]
+    if not outliers.empty:
+        datasets['outliers'] = outliers[[x, 'value']]
+        layers.append({
+            'data': {'name': 'outliers'},
+            'mark': 'point',
+            'encoding': encoding,
+        })
+    return dict(datasets=datasets, layer=layers, **properties)
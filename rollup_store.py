@@ -0,0 +1,156 @@
+import glob
+import os
+import threading
+
+import pandas as pd
+
+from chunked_reader import content_hash, iter_chunks
+from market_data import CACHE_DIR
+
+DEFAULT_ROLLUP_DIR = os.path.join(CACHE_DIR, 'rollups')
+
+# Rollup resolutions, finest first; each is aggregated from the one before it
+RESOLUTIONS = {'minute': 'min', 'hour': 'h', 'day': 'D'}
+AGGREGATIONS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+# Statistics per bucket of `freq` from finer rollup rows (or, for minutes, raw samples as 1-count rows)
+def _coarsen(rollup, freq):
+    return rollup.groupby(rollup.index.floor(freq)).agg(AGGREGATIONS).rename_axis('TS')
+
+
+# Raw samples seen as one-sample buckets, so the minute rollup is built like the coarser ones
+def _as_rollup(raw):
+    rollup = raw.assign(count=1.0).rename(columns={'value': 'sum'})
+    rollup['min'] = rollup['max'] = rollup['sum']
+    return rollup
+
+
+def _months(index):
+    return index.to_period('M').astype(str)
+
+
+# Whether a 'YYYY-MM' partition can hold timestamps in [start, end)
+def _overlaps(month, start, end):
+    if start is not None and month < pd.Timestamp(start).strftime('%Y-%m'):
+        return False
+    return end is None or month <= (pd.Timestamp(end) - pd.Timedelta(1, 'ns')).strftime('%Y-%m')
+
+
+def _between(frame, start, end):
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame.index < pd.Timestamp(end)]
+    return frame
+
+
+class RollupStore:
+    """Raw samples of one series in monthly Parquet partitions, with minute, hour and day rollups.
+
+    Each rollup holds sum, count, min and max per bucket, also in monthly
+    files. `append()` writes the new samples as a new raw part and merges
+    their buckets into only the rollup months they touch; `query()` reads
+    just the months of one resolution that overlap the requested range.
+    Rollup months record the parts merged into them, so an ingest that is
+    retried after a failure does not count its samples twice.
+    """
+
+    def __init__(self, root, time_column='TS', value_column='RAW_VALUE'):
+        self.root = root
+        self.time_column = time_column
+        self.value_column = value_column
+        self._lock = threading.Lock()
+
+    def _path(self, resolution, month):
+        return os.path.join(self.root, resolution, f'{month}.parquet')
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, '_ingested')
+
+    def ingested(self):
+        if not os.path.exists(self.manifest_path):
+            return set()
+        with open(self.manifest_path) as f:
+            return set(f.read().split())
+
+    # Append every row of a spreadsheet/CSV/Parquet file, once per distinct file content
+    def ingest(self, source):
+        key = content_hash(source)
+        if key in self.ingested():
+            return False
+        # Only the minute rollup of the whole file is kept in memory; raw parts have fixed names,
+        # so writing one again on a retry replaces it
+        minutes = []
+        for i, (chunk, _) in enumerate(iter_chunks(source)):
+            raw = self._raw(chunk)
+            self._write_raw(raw, f'{key}-{i}')
+            minutes.append(_coarsen(_as_rollup(raw), RESOLUTIONS['minute']))
+        with self._lock:
+            if key in self.ingested():
+                return False
+            if minutes:
+                self._merge_rollups(pd.concat(minutes).groupby(level=0).agg(AGGREGATIONS), key)
+            with open(self.manifest_path, 'a') as f:
+                f.write(f'{key}\n')
+        return True
+
+    def append(self, samples, part=None):
+        raw = self._raw(samples)
+        if raw.empty:
+            return
+        part = part or pd.Timestamp.now().strftime('%Y%m%dT%H%M%S%f')
+        with self._lock:
+            self._write_raw(raw, part)
+            self._merge_rollups(_as_rollup(raw), part)
+
+    def _raw(self, samples):
+        samples = samples[[self.time_column, self.value_column]].dropna()
+        times = pd.DatetimeIndex(pd.to_datetime(samples[self.time_column]), name='TS')
+        return pd.DataFrame({'value': samples[self.value_column].to_numpy(dtype='float64')}, index=times)
+
+    def _write_raw(self, raw, part):
+        for month, rows in raw.groupby(_months(raw.index)):
+            os.makedirs(os.path.join(self.root, 'raw', month), exist_ok=True)
+            rows.to_parquet(os.path.join(self.root, 'raw', month, f'{part}.parquet'))
+
+    def _merge_rollups(self, rollup, part):
+        for resolution, freq in RESOLUTIONS.items():
+            rollup = _coarsen(rollup, freq)
+            self._merge(resolution, rollup, part)
+
+    # Each month file lists the parts merged into it and is replaced in one step, so merging a part
+    # again (e.g. a retried ingest) leaves it unchanged
+    def _merge(self, resolution, update, part):
+        os.makedirs(os.path.join(self.root, resolution), exist_ok=True)
+        for month, rows in update.groupby(_months(update.index)):
+            path = self._path(resolution, month)
+            parts = []
+            if os.path.exists(path):
+                stored = pd.read_parquet(path)
+                parts = stored.attrs.get('parts', [])
+                if part in parts:
+                    continue
+                rows = pd.concat([stored, rows]).groupby(level=0).agg(AGGREGATIONS)
+            rows.attrs = {'parts': parts + [part]}
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            rows.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+
+    def query(self, resolution='day', start=None, end=None):
+        """sum, count, min, max and mean per `resolution` bucket with TS in [start, end), oldest first."""
+        paths = [path for path in sorted(glob.glob(self._path(resolution, '*')))
+                 if _overlaps(os.path.basename(path)[:7], start, end)]
+        if not paths:
+            return pd.DataFrame(columns=list(AGGREGATIONS) + ['mean'], index=pd.DatetimeIndex([], name='TS'))
+        rollup = _between(pd.concat([pd.read_parquet(path) for path in paths]).sort_index(), start, end)
+        return rollup.assign(mean=rollup['sum'] / rollup['count'])
+
+    # Raw samples with TS in [start, end), reading only the overlapping months
+    def raw(self, start=None, end=None):
+        paths = [path for path in sorted(glob.glob(os.path.join(self.root, 'raw', '*', '*.parquet')))
+                 if _overlaps(os.path.basename(os.path.dirname(path)), start, end)]
+        if not paths:
+            return pd.DataFrame(columns=['value'], index=pd.DatetimeIndex([], name='TS'))
+        return _between(pd.concat([pd.read_parquet(path) for path in paths]).sort_index(), start, end)
@@ -0,0 +1,158 @@
+import math
+import threading
+from collections import deque
+
+import pandas as pd
+
+RULES = {
+    'beyond_limits': 'Beyond control limits',
+    'run': 'Run on one side of the mean',
+    'trend': 'Steady rise or fall',
+}
+
+
+class _MaterialState:
+    """Welford mean/variance over the last `window` batches plus the run-rule counters."""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.batches = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.targeted = 0
+        self.breaches = 0
+        self.violations = 0
+        self.side = 0
+        self.run = 0
+        self.direction = 0
+        self.trend = 1
+        self.last = None
+
+    @property
+    def n(self):
+        return len(self.values)
+
+    @property
+    def std(self):
+        return math.sqrt(max(self.m2, 0.0) / (self.n - 1)) if self.n > 1 else math.nan
+
+    def push(self, x):
+        if self.values.maxlen is not None and self.n == self.values.maxlen:
+            # Remove the oldest value first so the window keeps its size (Welford in reverse)
+            old = self.values[0]
+            mean = (self.n * self.mean - old) / (self.n - 1) if self.n > 1 else 0.0
+            self.m2 -= (old - self.mean) * (old - mean)
+            self.mean = mean
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+
+class SPCEngine:
+    """Online statistical process control of CYCLE TIME per material.
+
+    Every batch is checked against the limits of the batches before it
+    (mean ± `sigma` standard deviations over the last `window` batches),
+    for a run of `run_length` on one side of the mean and for `trend_length`
+    batches rising or falling, and is counted as a breach when it exceeds
+    TARGET CYCLE TIME. Each batch costs O(1), so appended batches never
+    trigger a recomputation over the history. Batches must arrive in END
+    TIME order: `add()` raises ValueError for rows older than the newest
+    batch already added.
+    """
+
+    # stream_rows() feeds ordered sinks in global END TIME order
+    ordered = True
+
+    def __init__(self, sigma=3.0, window=100, warmup=20, run_length=8, trend_length=6,
+                 value='CYCLE TIME', target='TARGET CYCLE TIME'):
+        self.sigma = sigma
+        self.window = window
+        # Batches needed before limit, run and trend checks are trusted
+        self.warmup = warmup
+        self.run_length = run_length
+        self.trend_length = trend_length
+        self.value = value
+        self.target = target
+        self.states = {}
+        self.flagged = []
+        self.last_time = None
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        rows = rows.dropna(subset=['END TIME', self.value]).sort_values('END TIME', kind='stable')
+        # Plain Python scalars: the per-batch update is scalar arithmetic
+        materials = rows['MATERIAL'].astype(str).tolist()
+        values = rows[self.value].astype('float64').tolist()
+        targets = rows[self.target].astype('float64').tolist() if self.target in rows else [math.nan] * len(rows)
+        times = rows['END TIME'].tolist()
+        batches = rows['END BATCH CODE'].astype(str).tolist() if 'END BATCH CODE' in rows else [''] * len(rows)
+        with self._lock:
+            if times and self.last_time is not None and times[0] < self.last_time:
+                raise ValueError(f'Batches must be added in END TIME order: {times[0]} is before {self.last_time}')
+            for material, x, target, time, batch in zip(materials, values, targets, times, batches):
+                self._update(material, x, target, time, batch)
+            if times:
+                self.last_time = times[-1]
+        return self
+
+    def _update(self, material, x, target, time, batch):
+        state = self.states.get(material)
+        if state is None:
+            state = self.states[material] = _MaterialState(self.window)
+        rules = []
+        ready = state.n >= self.warmup
+
+        if ready and abs(x - state.mean) > self.sigma * state.std:
+            rules.append('beyond_limits')
+
+        side = (x > state.mean) - (x < state.mean) if state.n else 0
+        state.run = state.run + 1 if side and side == state.side else int(bool(side))
+        state.side = side
+        if ready and state.run >= self.run_length:
+            rules.append('run')
+
+        direction = 0 if state.last is None else (x > state.last) - (x < state.last)
+        state.trend = state.trend + 1 if direction and direction == state.direction else 1 + bool(direction)
+        state.direction = direction
+        state.last = x
+        if ready and state.trend >= self.trend_length:
+            rules.append('trend')
+
+        if not math.isnan(target):
+            state.targeted += 1
+            state.breaches += x > target
+        state.batches += 1
+        state.push(x)
+
+        if rules:
+            state.violations += 1
+            self.flagged.append({
+                'MATERIAL': material, 'END TIME': time, 'END BATCH CODE': batch, self.value: x,
+                'TARGET': target, 'RULE': ', '.join(RULES[rule] for rule in rules),
+            })
+
+    def summary(self):
+        """Current mean, standard deviation, control limits, target-breach rate and violations per material."""
+        with self._lock:
+            rows = [{
+                'MATERIAL': material,
+                'Batches': state.batches,
+                'Mean': state.mean,
+                'Std': state.std,
+                'LCL': state.mean - self.sigma * state.std,
+                'UCL': state.mean + self.sigma * state.std,
+                'Target breach rate': state.breaches / state.targeted if state.targeted else math.nan,
+                'Violations': state.violations,
+            } for material, state in sorted(self.states.items())]
+        return pd.DataFrame(rows)
+
+    # Flagged batches, oldest first, optionally for one material
+    def flags(self, material=None):
+        with self._lock:
+            flagged = pd.DataFrame(self.flagged, columns=['MATERIAL', 'END TIME', 'END BATCH CODE', self.value,
+                                                          'TARGET', 'RULE'])
+        if material is not None:
+            flagged = flagged[flagged['MATERIAL'] == str(material)]
+        return flagged.reset_index(drop=True)
@@ -1,10 +1,9 @@
 import streamlit as st
-import yfinance as yf
-import mplfinance as mpf
+from chart_render import get_chart_renderer
+from market_data import get_provider
 
 def load_data(ticker):
-    stock_data = yf.Ticker(ticker)
-    data = stock_data.history(period="1y")
+    data = get_provider().history(ticker, period="1y")
     return data
 
 st.title("Stock Price Visualization")
@@ -18,8 +17,9 @@ if not data.empty:
 
     st.write(data.tail())
 
-    fig, axlist = mpf.plot(data, type='candle', volume=True, returnfig=True)
-    st.pyplot(fig)
+    # Candlestick image, rendered once per distinct data
+    image = get_chart_renderer().render('mplfinance', data, type='candle', volume=True)
+    st.image(image)
 else:
     st.write("Invalid ticker or no data available.")
 
@@ -1,10 +1,10 @@
 import streamlit as st
-import yfinance as yf
-import mplfinance as mpf
 import pandas as pd
 from datetime import date
 from dateutil.relativedelta import relativedelta
 import numpy as np
+from chart_render import get_chart_renderer
+from market_data import get_provider
 
 # --------------------------------------------------------------------------
 # Streamlit Title
@@ -23,7 +23,7 @@ start_date = end_date - relativedelta(years=1)
 st.subheader("Fetching Data from Yahoo Finance...")
 
 with st.spinner("Fetching L’Oréal (OR.PA) stock data..."):
-    data = yf.download("AAPL", start=start_date, end=end_date, interval="1d")
+    data = get_provider().history("AAPL", start=start_date, end=end_date, interval="1d")
 
 # --------------------------------------------------------------------------
 # Debugging Step 1: Show Raw Data
@@ -92,16 +92,17 @@ if data.empty:
 # --------------------------------------------------------------------------
 try:
     st.subheader("📊 Candlestick Chart")
-    fig, axlist = mpf.plot(
-        data,
+    # Drawn in a worker process; an unchanged chart comes straight from the image cache
+    image = get_chart_renderer().render(
+        'mplfinance',
+        data[required_columns],
         type="candle",
         style="yahoo",
         title=f"📊 L’Oréal (OR.PA) from {start_date} to {end_date}",
         volume=True,
         mav=(20, 50),  # Moving Averages (20-day, 50-day)
-        figsize=(10, 6),
-        returnfig=True
+        figsize=(10, 6)
     )
-    st.pyplot(fig)
+    st.image(image)
 except Exception as e:
     st.error(f"❌ mplfinance plotting error: {e}")
@@ -1,32 +1,29 @@
 import streamlit as st
 import altair as alt
-import pandas as pd
+from cycle_time_cube import get_cube
+from cycle_time_data import dataset_key
+from quantile_sketch import boxplot_spec
+from time_buckets import period_labels
 
-def load_data(uploaded_file):
-    data = pd.read_excel(uploaded_file)
-    # Convert 'END TIME' to datetime and create interval columns
-    data['END TIME'] = pd.to_datetime(data['END TIME'])
-    data['MONTH_YEAR'] = data['END TIME'].dt.to_period('M').astype(str)
-    data['WEEK_YEAR'] = data['END TIME'].dt.strftime('%Y - W%V')
-    return data
+INTERVALS = {'Weekly': 'week', 'Monthly': 'month', 'Quarterly': 'quarter'}
 
 st.title("Manufacturing Batch Cycle Times Analysis")
 
 # File uploader
-uploaded_file = st.file_uploader("Upload your Excel file", type='xlsx')
+uploaded_file = st.file_uploader("Upload your Excel, CSV or Parquet file", type=['xlsx', 'csv', 'parquet'])
 if uploaded_file is not None:
-    data = load_data(uploaded_file)
+    # Rows are read in chunks straight into the cube; only its aggregates stay in memory
+    cube, spc = get_cube(dataset_key(uploaded_file), uploaded_file, with_spc=True)
     
     # Toggle for selecting time interval
-    interval = st.radio("Choose the analysis interval:", ('Weekly', 'Monthly'))
-    interval_col = 'MONTH_YEAR' if interval == 'Monthly' else 'WEEK_YEAR'
+    interval = st.radio("Choose the analysis interval:", tuple(INTERVALS))
+    level = INTERVALS[interval]
+    interval_col = 'PERIOD'
     
-    # Aggregate data for overall average and per material average
-    overall_avg_data = data.groupby(interval_col)['CYCLE TIME'].mean().reset_index().rename(columns={'CYCLE TIME': 'Overall Average'})
-    material_avg_data = data.groupby(['MATERIAL', interval_col]).agg(
-        Average_Cycle_Time=('CYCLE TIME', 'mean'),
-        Number_of_Batches=('MATERIAL', 'size')
-    ).reset_index()
+    # Overall average and per material average are lookups in the cube
+    overall_avg_data = cube.overall_stats(level)[['PERIOD', 'mean']].rename(columns={'mean': 'Overall Average'})
+    material_avg_data = cube.material_stats(level)[['MATERIAL', 'PERIOD', 'mean', 'count']].rename(
+        columns={'mean': 'Average_Cycle_Time', 'count': 'Number_of_Batches'})
 
     # Line chart for overall average cycle time
     line = alt.Chart(overall_avg_data).mark_line(color='red').encode(
@@ -43,8 +40,17 @@ if uploaded_file is not None:
         tooltip=['MATERIAL', 'Average_Cycle_Time', 'Number_of_Batches']
     )
 
+    # Batches flagged by the control-limit, run and trend rules, placed in their interval
+    flags = spc.flags()
+    flags[interval_col] = period_labels(flags['END TIME'], level)
+    flagged = alt.Chart(flags).mark_point(shape='triangle-up', color='black', filled=True).encode(
+        x=alt.X(interval_col, title='Time Interval'),
+        y=alt.Y('CYCLE TIME', title='Average Cycle Time (days)'),
+        tooltip=['MATERIAL', 'END BATCH CODE', 'END TIME', 'CYCLE TIME', 'TARGET', 'RULE']
+    )
+
     # Combine charts with shared y-axis
-    combined_chart = alt.layer(line, circles).resolve_scale(
+    combined_chart = alt.layer(line, circles, flagged).resolve_scale(
         y='shared'
     ).properties(
         width=700,
@@ -53,16 +59,18 @@ if uploaded_file is not None:
     
     st.altair_chart(combined_chart, use_container_width=True)
 
+    # Rolling control limits over each material's latest batches
+    with st.expander('Control limits and rule violations'):
+        st.dataframe(spc.summary(), hide_index=True)
+
     # Material selector and boxplot for cycle time distribution
-    selected_material = st.selectbox('Select a material:', data['MATERIAL'].unique())
-    material_data = data[data['MATERIAL'] == selected_material]
-    boxplot = alt.Chart(material_data).mark_boxplot().encode(
-        x=alt.X(interval_col, title='Time Interval'),
-        y=alt.Y('CYCLE TIME', title='Cycle Time (days)')
-    ).properties(
+    selected_material = st.selectbox('Select a material:', cube.materials())
+    # Quartiles and whiskers come from the cube's sketches rather than every batch row
+    box_stats, outliers = cube.box_stats(selected_material, level)
+    boxplot = boxplot_spec(box_stats, outliers, interval_col, x_title='Time Interval',
         title=f'Cycle Time Distribution for {selected_material}',
         width=700,
         height=400
     )
     
-    st.altair_chart(boxplot, use_container_width=True)
+    st.vega_lite_chart(boxplot, use_container_width=True)
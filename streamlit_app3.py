@@ -1,29 +1,30 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from cycle_time_cube import get_cube
+from cycle_time_data import dataset_key
+from quantile_sketch import boxplot_spec
+from time_buckets import period_labels
+
+INTERVALS = {'Monthly': 'month', 'Weekly': 'week', 'Quarterly': 'quarter'}
 
 # File uploader
-uploaded_file = st.file_uploader("Choose a file")
+uploaded_file = st.file_uploader("Choose a file", type=['xlsx', 'csv', 'parquet'])
 if uploaded_file is not None:
-    df = pd.read_excel(uploaded_file)
-
-    # Convert 'END TIME' to datetime
-    df['END TIME'] = pd.to_datetime(df['END TIME'])
+    # Aggregates and SPC state for this file, shared across sessions
+    cube, spc = get_cube(dataset_key(uploaded_file), uploaded_file, with_spc=True)
 
     # Toggle for time interval selection
-    interval = st.radio("Select the time interval:", ('Monthly', 'Weekly'))
-
-    # Format 'END TIME' based on selected interval
-    if interval == 'Monthly':
-        df['Time Interval'] = df['END TIME'].dt.strftime('%Y-%m')
-    else:
-        df['Time Interval'] = df['END TIME'].dt.strftime('%Y-%U')
+    interval = st.radio("Select the time interval:", tuple(INTERVALS))
+    level = INTERVALS[interval]
 
-    # Calculate overall average cycle time
-    overall_avg_cycle_time = df.groupby('Time Interval')['CYCLE TIME'].mean().reset_index(name='Overall Average Cycle Time')
+    # Overall average cycle time, looked up in the cube
+    overall_avg_cycle_time = cube.overall_stats(level)[['PERIOD', 'mean']].rename(
+        columns={'PERIOD': 'Time Interval', 'mean': 'Overall Average Cycle Time'})
 
-    # Calculate average cycle time for each material
-    material_avg = df.groupby(['MATERIAL', 'Time Interval'])['CYCLE TIME'].mean().reset_index(name='Material Average Cycle Time')
+    # Average cycle time and batch count for each material
+    material_avg = cube.material_stats(level)[['MATERIAL', 'PERIOD', 'mean', 'count']].rename(
+        columns={'PERIOD': 'Time Interval', 'mean': 'Material Average Cycle Time', 'count': 'Batches'})
 
     # Merge the overall average with material averages
     merged_df = pd.merge(material_avg, overall_avg_cycle_time, on='Time Interval')
@@ -37,17 +38,29 @@ if uploaded_file is not None:
     )
     points = base.mark_circle().encode(
         alt.Y('Material Average Cycle Time:Q', title='Cycle Time (days)'),
-        alt.Size('count(MATERIAL):Q'),
+        alt.Size('Batches:Q'),
         alt.Color('MATERIAL:N', legend=alt.Legend(title="Material"))
     )
-    chart = alt.layer(line, points).resolve_scale(y='shared')
+    # SPC violations as markers
+    flags = spc.flags()
+    flags['Time Interval'] = period_labels(flags['END TIME'], level)
+    flagged = alt.Chart(flags).mark_point(shape='triangle-up', color='black', filled=True).encode(
+        alt.X('Time Interval:N'),
+        alt.Y('CYCLE TIME:Q', title='Cycle Time (days)'),
+        tooltip=['MATERIAL', 'END BATCH CODE', 'END TIME', 'CYCLE TIME', 'TARGET', 'RULE']
+    )
+    chart = alt.layer(line, points, flagged).resolve_scale(y='shared')
     st.altair_chart(chart, use_container_width=True)
 
+    # SPC table
+    with st.expander('Control limits and rule violations'):
+        st.dataframe(spc.summary(), hide_index=True)
+
     # Material selector for boxplot
-    material = st.selectbox("Select a material:", df['MATERIAL'].unique())
-    material_df = df[df['MATERIAL'] == material]
-    boxplot = alt.Chart(material_df).mark_boxplot().encode(
-        alt.X('Time Interval:N', axis=alt.Axis(title=interval + ' Interval')),
-        alt.Y('CYCLE TIME:Q', axis=alt.Axis(title='Cycle Time (days)'))
-    )
-    st.altair_chart(boxplot, use_container_width=True)
+    material = st.selectbox("Select a material:", cube.materials())
+    # Box statistics from the cube
+    box_stats, outliers = cube.box_stats(material, level)
+    boxplot = boxplot_spec(box_stats.rename(columns={'PERIOD': 'Time Interval'}),
+                           outliers.rename(columns={'PERIOD': 'Time Interval'}),
+                           'Time Interval', x_title=interval + ' Interval')
+    st.vega_lite_chart(boxplot, use_container_width=True)
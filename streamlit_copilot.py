@@ -1,44 +1,43 @@
+import os
 import streamlit as st
 import pandas as pd
 import altair as alt
+from chart_data import period_aggregate
+from cycle_time_cube import get_cube
+from cycle_time_data import dataset_key
+from plant_history import DEFAULT_HISTORY_DIR, PlantHistory
+from quantile_sketch import boxplot_spec
 
-# Function to load data
-def load_data(uploaded_file):
-    if uploaded_file is not None:
-        df = pd.read_excel(uploaded_file)
-        return df
-    else:
-        return pd.DataFrame()
+LEVELS = {'monthly': 'month', 'weekly': 'week'}
+
+# Partitioned copy of each uploaded file, written once
+@st.cache_resource(max_entries=8, show_spinner='Indexing batches...')
+def get_history(dataset, _source):
+    history = PlantHistory(os.path.join(DEFAULT_HISTORY_DIR, dataset))
+    history.ingest(_source)
+    return history
+
+# Function to load data: only the year/month partitions in the date range are read, and the rows are
+# reduced to one per chart mark here instead of being aggregated by Vega in the browser
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_data(dataset, _history, start, end, level):
+    df = _history.query(start=start, end=end, columns=['MATERIAL', 'END TIME', 'CYCLE TIME'])
+    return period_aggregate(df, level), period_aggregate(df, level, by='MATERIAL')
 
 # Function to generate the plot
-def generate_plot(df, interval):
-    # Ensure CYCLE TIME is numeric
-    df['CYCLE TIME'] = pd.to_numeric(df['CYCLE TIME'], errors='coerce')
-    
-    # Calculate overall average cycle time
-    overall_avg_cycle_time = df['CYCLE TIME'].mean()
-    
-    # Calculate average cycle time for each material
-    material_avg = df.groupby('MATERIAL')['CYCLE TIME'].mean().reset_index()
-    
-    # Calculate number of batches for each material
-    material_counts = df['MATERIAL'].value_counts().reset_index()
-    material_counts.columns = ['MATERIAL', 'BATCH_COUNT']
-    
-    # Merge the two dataframes
-    material_avg = material_avg.merge(material_counts, on='MATERIAL')
-    
+def generate_plot(overall_avg, material_avg):
     # Create the base line chart for overall average
-    line = alt.Chart(df).mark_line().encode(
-        x=alt.X('END TIME:T', timeUnit=interval),
-        y=alt.Y('mean(CYCLE TIME):Q', title='Average Cycle Time')
+    line = alt.Chart(overall_avg).mark_line().encode(
+        x=alt.X('PERIOD:N', title='END TIME'),
+        y=alt.Y('mean:Q', title='Average Cycle Time')
     )
     
     # Create the circle chart for each material
     points = alt.Chart(material_avg).mark_circle().encode(
-        x=alt.X('END TIME:T', timeUnit=interval),
-        y=alt.Y('CYCLE TIME:Q', title=''),
-        size='BATCH_COUNT:Q'
+        x=alt.X('PERIOD:N', title='END TIME'),
+        y=alt.Y('mean:Q', title=''),
+        size=alt.Size('count:Q', title='BATCH_COUNT'),
+        tooltip=['MATERIAL', 'PERIOD', 'mean', 'count']
     )
     
     # Combine the two charts
@@ -51,28 +50,34 @@ def main():
     st.title('Manufacturing Batch Cycle Time Analysis')
     
     # File uploader
-    uploaded_file = st.file_uploader("Choose an Excel file", type='xlsx')
+    uploaded_file = st.file_uploader("Choose an Excel, CSV or Parquet file", type=['xlsx', 'csv', 'parquet'])
     if uploaded_file is not None:
-        df = load_data(uploaded_file)
+        dataset = dataset_key(uploaded_file)
+        cube, _ = get_cube(dataset, uploaded_file)
+        history = get_history(dataset, uploaded_file)
+        
+        # Date range, pushed down to the partitioned history
+        first, last = history.date_bounds()
+        dates = st.date_input('Date range', (first, last), min_value=first, max_value=last)
+        start, end = (dates[0], dates[-1]) if dates else (first, last)
+        start, end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
         
         # Toggle for time intervals
         interval = st.radio("Select Time Interval", ('monthly', 'weekly'))
+        overall_avg, material_avg = load_data(dataset, history, start, end, LEVELS[interval])
         
         # Generate and display plot
-        st.altair_chart(generate_plot(df, interval), use_container_width=True)
+        st.altair_chart(generate_plot(overall_avg, material_avg), use_container_width=True)
         
         # Selector for materials
-        material = st.selectbox('Select a Material', df['MATERIAL'].unique())
+        material = st.selectbox('Select a Material', cube.materials())
         
-        # Filter data for selected material
-        material_df = df[df['MATERIAL'] == material]
+        # Box statistics for the selected material, computed server-side from quantile sketches
+        box_stats, outliers = cube.box_stats(material, LEVELS[interval], start, end)
         
         # Generate and display boxplot for selected material
-        boxplot = alt.Chart(material_df).mark_boxplot().encode(
-            x=alt.X('END TIME:T', timeUnit=interval),
-            y='CYCLE TIME:Q'
-        )
-        st.altair_chart(boxplot, use_container_width=True)
+        boxplot = boxplot_spec(box_stats, outliers, 'PERIOD', x_title='END TIME')
+        st.vega_lite_chart(boxplot, use_container_width=True)
 
 if __name__ == "__main__":
     main()
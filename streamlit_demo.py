@@ -1,8 +1,9 @@
 import streamlit as st
-import yfinance as yf
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import date, timedelta
+from price_panel import load_panel
+from watchlist_scheduler import get_scheduler, latest, refresh_cached
 
 # Define stock tickers
 stock_tickers = ["MSFT", "GOOG", "TSLA", "NVDA", "SAN.PA", "OR.PA"]
@@ -11,12 +12,23 @@ stock_tickers = ["MSFT", "GOOG", "TSLA", "NVDA", "SAN.PA", "OR.PA"]
 end_date = date.today()
 start_date = end_date - timedelta(days=365*10)
 
-# Fetch stock data
-def get_stock_data(ticker, start, end):
-    return yf.download(ticker, start=start, end=end)
+# Fetch data for all stock tickers in one request into a ticker × date × OHLCV panel,
+# kept as a shared resource so reruns reuse the same array instead of copying it; `generation` is bumped
+# by the watchlist refresh once a newer panel is ready
+@st.cache_resource(ttl=60 * 60)
+def get_stock_panel(tickers, start, end, generation=0):
+    return load_panel(tickers, start, end)
 
-# Fetch data for all stock tickers
-data = {ticker: get_stock_data(ticker, start_date, end_date) for ticker in stock_tickers}
+# Refreshed in the background at startup, every 45 minutes and after the market close,
+# so sessions read a warm panel
+def refresh_watchlist():
+    end = date.today()
+    refresh_cached(get_stock_panel, [(tuple(stock_tickers), end - timedelta(days=365*10), end)])
+
+scheduler = get_scheduler()
+scheduler.register('streamlit_demo watchlist', refresh_watchlist)
+
+panel = latest(get_stock_panel, tuple(stock_tickers), start_date, end_date)
 
 # Plot line chart for market close data
 st.title("Stock Performance Analysis")
@@ -24,8 +36,9 @@ st.subheader("Market Close Data (Last 10 Years)")
 
 # Create a line chart for multiple stock tickers
 fig = go.Figure()
-for ticker in stock_tickers:
-    fig.add_trace(go.Scatter(x=data[ticker].index, y=data[ticker]['Close'], mode='lines', name=ticker))
+close_prices = panel.field('Close')
+for i, ticker in enumerate(panel.tickers):
+    fig.add_trace(go.Scatter(x=panel.dates, y=close_prices[i], mode='lines', name=ticker, connectgaps=True))
 
 fig.update_layout(
     xaxis_title='Date',
@@ -38,8 +51,8 @@ st.plotly_chart(fig)
 # Dropdown to select a stock ticker for candlestick chart
 selected_ticker = st.selectbox("Select a stock ticker for candlestick chart", stock_tickers)
 
-# Fetch selected stock data
-selected_data = data[selected_ticker]
+# View of the selected stock's rows in the panel
+selected_data = panel.ticker(selected_ticker)
 
 # Plot candlestick chart for selected stock ticker
 st.subheader(f"Candlestick Chart for {selected_ticker}")
@@ -56,3 +69,6 @@ candlestick_fig.update_layout(
     template='plotly_dark'
 )
 st.plotly_chart(candlestick_fig)
+
+with st.sidebar.expander("Data refresh"):
+    st.dataframe(scheduler.metrics(['streamlit_demo watchlist']), hide_index=True)
@@ -1,7 +1,80 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
 import pandas as pd
+from ohlcv_store import OHLCVStore
+from history_cache import HistoryCache, store_fetch
+from ohlcv_pyramid import OHLCVPyramid, RESOLUTIONS
+from downsample import downsample_line, downsample_ohlc
+from fundamentals import FundamentalsCache, historical_market_cap
+from figure_cache import plotly_chart_cached, date_range_xaxis
+
+# Shared on-disk OHLCV store: only bars newer than the last stored date are downloaded
+@st.cache_resource
+def get_ohlcv_store():
+    return OHLCVStore()
+
+# In-memory history cache in front of the store, shared by all sessions
+@st.cache_resource
+def get_history_cache():
+    return HistoryCache(fetch=store_fetch(get_ohlcv_store()))
+
+history_cache = get_history_cache()
+
+# Share count and split history per ticker, kept on disk and refreshed daily
+@st.cache_resource
+def get_fundamentals_cache():
+    return FundamentalsCache()
+
+# Per-ticker day/week/month/quarter/year bars, built once and shared by all sessions
+@st.cache_resource(max_entries=64)
+def get_pyramid(ticker):
+    return OHLCVPyramid()
+
+# Line chart with one downsampled trace per ticker and the shared date range selector
+def build_line_figure(series_by_ticker, title, yaxis_title):
+    fig = go.Figure()
+    for ticker, series in series_by_ticker.items():
+        # Traces are downsampled outside the last year
+        series = downsample_line(series)
+        fig.add_trace(go.Scatter(
+            x=series.index,
+            y=series,
+            mode='lines',
+            name=ticker
+        ))
+    # Add range slider and range selector
+    fig.update_layout(
+        title=title,
+        xaxis_title='Date',
+        yaxis_title=yaxis_title,
+        xaxis=date_range_xaxis(),
+        yaxis=dict(
+            autorange=True
+        )
+    )
+    return fig
+
+def build_candlestick_figure(bars, ticker):
+    # Long daily histories are merged into min-max bars before the last year, which stays at full detail
+    bars = downsample_ohlc(bars)
+    fig = go.Figure(data=[go.Candlestick(
+        x=bars.index,
+        open=bars['Open'],
+        high=bars['High'],
+        low=bars['Low'],
+        close=bars['Close'],
+        name=ticker
+    )])
+    fig.update_layout(
+        title=f'{ticker} Candlestick Chart',
+        xaxis_title='Date',
+        yaxis_title='Price',
+        xaxis=date_range_xaxis(),
+        yaxis=dict(
+            autorange=True
+        )
+    )
+    return fig
 
 # Set up the Streamlit app
 st.title('Stock Price and Market Capitalization Viewer')
@@ -14,148 +87,57 @@ ticker_list = [ticker.strip() for ticker in tickers.split(',')]
 
 # Retrieve and plot stock price data for each ticker
 if ticker_list:
-    price_fig = go.Figure()
-    market_cap_fig = go.Figure()
+    close_prices = {}
+    market_caps = {}
+    # Share count histories for all tickers, fetched in parallel when missing or stale
+    fundamentals = get_fundamentals_cache().load_many(ticker_list)
     
     for ticker in ticker_list:
-        stock_data = yf.Ticker(ticker)
-        hist = stock_data.history(period='max')
+        hist = history_cache.get(ticker, period='max')
         
         # Check if the data is not empty
         if not hist.empty:
-            # Add a trace for each ticker in the price chart
-            price_fig.add_trace(go.Scatter(
-                x=hist.index,
-                y=hist['Close'],
-                mode='lines',
-                name=ticker
-            ))
+            close_prices[ticker] = hist['Close']
             
-            # Calculate market capitalization and add a trace for each ticker in the market cap chart
-            shares_outstanding = stock_data.info.get('sharesOutstanding')
-            if shares_outstanding:
-                hist['Market Cap'] = hist['Close'] * shares_outstanding
-                market_cap_fig.add_trace(go.Scatter(
-                    x=hist.index,
-                    y=hist['Market Cap'],
-                    mode='lines',
-                    name=ticker
-                ))
+            # Calculate market capitalization over time from the share count in effect on each date
+            if ticker in fundamentals and not fundamentals[ticker]['Shares'].dropna().empty:
+                market_caps[ticker] = historical_market_cap(hist['Close'], fundamentals[ticker])
     
-    # Add range slider and range selector to the price chart
-    price_fig.update_layout(
-        title='Stock Prices',
-        xaxis_title='Date',
-        yaxis_title='Close Price',
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label='1m', step='month', stepmode='backward'),
-                    dict(count=3, label='3m', step='month', stepmode='backward'),
-                    dict(count=6, label='6m', step='month', stepmode='backward'),
-                    dict(count=1, label='YTD', step='year', stepmode='todate'),
-                    dict(count=1, label='1y', step='year', stepmode='backward'),
-                    dict(step='all')
-                ])
-            ),
-            rangeslider=dict(
-                visible=True
-            ),
-            type='date'
-        ),
-        yaxis=dict(
-            autorange=True
-        )
-    )
-    
-    # Add range slider and range selector to the market cap chart
-    market_cap_fig.update_layout(
-        title='Market Capitalization',
-        xaxis_title='Date',
-        yaxis_title='Market Cap',
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label='1m', step='month', stepmode='backward'),
-                    dict(count=3, label='3m', step='month', stepmode='backward'),
-                    dict(count=6, label='6m', step='month', stepmode='backward'),
-                    dict(count=1, label='YTD', step='year', stepmode='todate'),
-                    dict(count=1, label='1y', step='year', stepmode='backward'),
-                    dict(step='all')
-                ])
-            ),
-            rangeslider=dict(
-                visible=True
-            ),
-            type='date'
-        ),
-        yaxis=dict(
-            autorange=True
-        )
-    )
-    
-    st.plotly_chart(price_fig)
-    st.plotly_chart(market_cap_fig)
+    # Charts are only rebuilt and re-serialized when their inputs change
+    chart_timings = [
+        plotly_chart_cached('price', [close_prices],
+                            lambda: build_line_figure(close_prices, 'Stock Prices', 'Close Price')),
+        plotly_chart_cached('market_cap', [market_caps],
+                            lambda: build_line_figure(market_caps, 'Market Capitalization', 'Market Cap')),
+    ]
     
     # Add dropdown to select a ticker and resampling interval
     selected_ticker = st.selectbox('Select Ticker for Candlestick Chart', ticker_list)
-    resample_interval = st.selectbox('Select Resampling Interval', ['D', 'W', 'M'])
+    resample_interval = st.selectbox('Select Resampling Interval', list(RESOLUTIONS))
     
     if selected_ticker:
-        selected_stock_data = yf.Ticker(selected_ticker)
-        selected_hist = selected_stock_data.history(period='max')
+        selected_hist = history_cache.get(selected_ticker, period='max')
         
         if not selected_hist.empty:
-            # Ensure the index is a DateTimeIndex and handle resampling
+            # Ensure the index is a DateTimeIndex
             selected_hist.index = pd.to_datetime(selected_hist.index)
             
-            if resample_interval != 'D':
-                resampled_hist = selected_hist.resample(resample_interval).agg({
-                    'Open': 'first',
-                    'High': 'max',
-                    'Low': 'min',
-                    'Close': 'last',
-                    'Volume': 'sum'
-                }).dropna()
-            else:
-                resampled_hist = selected_hist
+            # Switching resolution is a lookup; only bars added since the last rerun are aggregated
+            resampled_hist = get_pyramid(selected_ticker).update(selected_hist).level(resample_interval)
             
             # Create a candlestick chart
-            candlestick_fig = go.Figure(data=[go.Candlestick(
-                x=resampled_hist.index,
-                open=resampled_hist['Open'],
-                high=resampled_hist['High'],
-                low=resampled_hist['Low'],
-                close=resampled_hist['Close'],
-                name=selected_ticker
-            )])
-            
-            candlestick_fig.update_layout(
-                title=f'{selected_ticker} Candlestick Chart',
-                xaxis_title='Date',
-                yaxis_title='Price',
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label='1m', step='month', stepmode='backward'),
-                            dict(count=3, label='3m', step='month', stepmode='backward'),
-                            dict(count=6, label='6m', step='month', stepmode='backward'),
-                            dict(count=1, label='YTD', step='year', stepmode='todate'),
-                            dict(count=1, label='1y', step='year', stepmode='backward'),
-                            dict(step='all')
-                        ])
-                    ),
-                    rangeslider=dict(
-                        visible=True
-                    ),
-                    type='date'
-                ),
-                yaxis=dict(
-                    autorange=True
-                )
-            )
-            
-            st.plotly_chart(candlestick_fig)
+            chart_timings.append(plotly_chart_cached(
+                'candlestick', [selected_ticker, resample_interval, resampled_hist],
+                lambda: build_candlestick_figure(resampled_hist, selected_ticker)))
+
+    # Time spent building and serializing each chart on this run
+    with st.expander('Chart timings'):
+        st.dataframe(pd.DataFrame(chart_timings).set_index('chart'))
+
+    # Report how many history requests the shared cache answered without fetching
+    cache_stats = history_cache.stats()
+    st.caption(f"History cache: {cache_stats['hits'] + cache_stats['slice_hits']} hits, "
+               f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
 else:
     st.write('Please enter at least one ticker symbol.')
 
@@ -1,20 +1,38 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
+from chunked_reader import iter_chunks
 
+PATH = ['BUSINESS UNIT (Snow)', 'Business  Capability', 'Business Sub Capability', 'Analytical Cost Nature', 'product',
+        'Competitive advantage', 'Business critical', 'AIMS OUTSOURCING LEVEL', 'Vendor']
+VALUE = ' Horizon 2025'
+
+# One row per sunburst leaf: summed budget and budget-weighted freq, which is what the chart
+# would compute from the raw rows. The file is read in chunks, so memory follows the number of leaves.
+@st.cache_data(max_entries=8, show_spinner=False)
 def load_data(uploaded_file):
-    data = pd.read_excel(uploaded_file)
+    progress = st.progress(0.0, text='Reading rows...')
+    partials = []
+    for chunk, done in iter_chunks(uploaded_file):
+        weights = chunk[VALUE].where(chunk['freq'].notna())
+        chunk = chunk.assign(freq_sum=weights * chunk['freq'], freq_weight=weights)
+        partials.append(chunk.groupby(PATH, dropna=False, sort=False)[[VALUE, 'freq_sum', 'freq_weight']].sum())
+        if len(partials) > 8:
+            partials = [pd.concat(partials).groupby(level=PATH, dropna=False, sort=False).sum()]
+        progress.progress(done, text=f'Reading rows... {done:.0%}')
+    progress.empty()
+    data = pd.concat(partials).groupby(level=PATH, dropna=False, sort=False).sum().reset_index()
+    data['freq'] = data.pop('freq_sum') / data.pop('freq_weight')
     return data
 
 st.title("Sunburst budget analysis")
 
 # File uploader
-uploaded_file = st.file_uploader("Upload your Excel file", type='xlsx')
+uploaded_file = st.file_uploader("Upload your Excel, CSV or Parquet file", type=['xlsx', 'csv', 'parquet'])
 if uploaded_file is not None:
     data = load_data(uploaded_file)
-    fig = px.sunburst(data, path=['BUSINESS UNIT (Snow)', 'Business  Capability', 'Business Sub Capability', 'Analytical Cost Nature', 'product',
-                              'Competitive advantage', 'Business critical', 'AIMS OUTSOURCING LEVEL', 'Vendor'],
-                  values=' Horizon 2025',
+    fig = px.sunburst(data, path=PATH,
+                  values=VALUE,
                   color='freq',
                   color_continuous_scale='rdbu_r',
                   width=960, height=600
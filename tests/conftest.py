@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root; keep their default caches out of the working tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('APP_CACHE_DIR', tempfile.mkdtemp(prefix='app-cache-'))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import downsample_line, downsample_ohlc, lttb, minmax_ohlc
+
+
+def make_bars(days, seed=0):
+    index = pd.date_range('2010-01-01', periods=days, freq='B', name='Date')
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, days))
+    spread = rng.uniform(0.5, 2, days)
+    return pd.DataFrame({'Open': close + rng.uniform(-0.5, 0.5, days), 'High': close + spread,
+                         'Low': close - spread, 'Close': close, 'Volume': rng.integers(1, 1000, days)}, index=index)
+
+
+def test_lttb_keeps_the_ends_and_the_extremes():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[[250, 600]] = 10, -10
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert {250, 600} <= set(keep.tolist())
+
+
+@pytest.mark.parametrize('n', [2, 100, 200])
+def test_lttb_keeps_everything_when_it_cannot_reduce(n):
+    np.testing.assert_array_equal(lttb(np.arange(100), np.arange(100.0), n), np.arange(100))
+
+
+def test_minmax_ohlc_keeps_the_envelope():
+    bars = make_bars(1000)
+    reduced = minmax_ohlc(bars, 70)
+    assert len(reduced) == 70
+    assert reduced.index[0] == bars.index[0]
+    assert reduced['Open'].iloc[0] == bars['Open'].iloc[0]
+    assert reduced['Close'].iloc[-1] == bars['Close'].iloc[-1]
+    assert reduced['High'].max() == bars['High'].max()
+    assert reduced['Low'].min() == bars['Low'].min()
+    assert reduced['Volume'].sum() == bars['Volume'].sum()
+    # Each merged bar covers the original bars up to the next one
+    groups = bars.index.searchsorted(reduced.index)
+    second = bars.iloc[groups[1]:groups[2]]
+    assert reduced['High'].iloc[1] == second['High'].max()
+    assert reduced['Close'].iloc[1] == second['Close'].iloc[-1]
+
+
+def test_recent_window_is_kept_at_full_detail():
+    bars = make_bars(20 * 260)
+    line = downsample_line(bars['Close'], budget=1000)
+    ohlc = downsample_ohlc(bars, budget=1000)
+    recent = bars.index >= bars.index[-1] - pd.DateOffset(years=1)
+    for reduced in (line, ohlc):
+        assert len(reduced) <= 1000
+        assert reduced.index.is_monotonic_increasing
+        assert reduced.index[0] == bars.index[0]
+        assert reduced.index[-recent.sum():].equals(bars.index[recent])
+    pd.testing.assert_frame_equal(ohlc.iloc[-recent.sum():], bars[recent], check_freq=False)
+
+
+def test_short_series_are_returned_unchanged():
+    bars = make_bars(500)
+    pd.testing.assert_series_equal(downsample_line(bars['Close'], budget=1000), bars['Close'])
+    assert downsample_ohlc(bars, budget=1000) is bars
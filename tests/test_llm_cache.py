@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache, LLMClient
+from market_data import MarketDataProvider
+
+
+class StubProvider(MarketDataProvider):
+    """Offline stand-in for the model: echoes the prompt and counts the calls."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, prompt, max_tokens=150, model=None):
+        self.prompts.append(prompt)
+        return f'reply to {prompt}'
+
+    def history(self, *args, **kwargs):
+        raise NotImplementedError
+
+    download = news = info = fundamentals = openbb = history
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path), ttl=60, max_bytes=1 << 20)
+
+
+def test_put_then_get(cache):
+    key = cache.key('model', 'prompt', 100, '2024-05-03')
+    assert cache.get(key) is None
+    cache.put(key, 'text')
+    assert cache.get(key) == 'text'
+
+
+def test_key_depends_on_every_part(cache):
+    keys = {cache.key('model', 'prompt', 100, '2024-05-03'), cache.key('other', 'prompt', 100, '2024-05-03'),
+            cache.key('model', 'other', 100, '2024-05-03'), cache.key('model', 'prompt', 200, '2024-05-03'),
+            cache.key('model', 'prompt', 100, '2024-05-06')}
+    assert len(keys) == 5
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    key = cache.key('model', 'prompt', 100, '2024-05-03')
+    cache.put(key, 'text')
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now + cache.ttl + 1)
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = LLMCache(str(tmp_path), ttl=3600, max_bytes=10_000)
+    keys = [cache.key('model', f'prompt {i}', 100, '2024-05-03') for i in range(3)]
+    for age, key in zip((300, 200, 100), keys):
+        cache.put(key, 'x' * 3000)
+        # Backdate each file so the order does not depend on the file system's timestamp resolution
+        os.utime(cache._path(key), (time.time() - age, time.time() - age))
+    # A hit makes the oldest entry the most recently used
+    assert cache.get(keys[0]) is not None
+
+    cache.put(cache.key('model', 'prompt 3', 100, '2024-05-03'), 'x' * 3000)
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_client_asks_the_model_once_per_prompt(cache):
+    provider = StubProvider()
+    client = LLMClient(cache, provider)
+    assert client.complete_many(['a', 'b', 'a']) == ['reply to a', 'reply to b', 'reply to a']
+    assert client.complete('b') == 'reply to b'
+    assert sorted(set(provider.prompts)) == ['a', 'b']
+    assert provider.prompts.count('b') == 1
+
+
+def test_forget_drops_a_cached_reply(cache):
+    provider = StubProvider()
+    client = LLMClient(cache, provider)
+    client.complete('a')
+    client.forget('a')
+    client.complete('a')
+    assert provider.prompts == ['a', 'a']
+
+
+def test_stream_caches_the_joined_chunks(cache):
+    provider = StubProvider()
+    client = LLMClient(cache, provider)
+    assert ''.join(client.stream('a')) == 'reply to a'
+    assert list(client.stream('a')) == ['reply to a']
+    assert provider.prompts == ['a']
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlcv_store import OHLCV_COLUMNS, OHLCVStore
+
+
+class StandInSource:
+    """Offline source over a fixed set of daily bars, recording the `start` of every request."""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.requests = []
+
+    def __call__(self, ticker, start):
+        self.requests.append(start)
+        if start is None:
+            return self.bars.copy()
+        return self.bars[self.bars.index >= pd.Timestamp(start)].copy()
+
+
+def make_bars(days, seed=0):
+    index = pd.date_range('2024-01-01', periods=days, freq='B', name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, days))
+    return pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(days, 1e6)}, index=index)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(str(tmp_path), source=None, refresh_interval=3600)
+
+
+def test_first_history_fetches_everything(store):
+    source = store.source = StandInSource(make_bars(30))
+    history = store.history('AAPL')
+    assert source.requests == [None]
+    assert list(history.columns) == OHLCV_COLUMNS
+    pd.testing.assert_frame_equal(history, store.read('AAPL'), check_freq=False)
+    assert len(history) == 30
+
+
+def test_fresh_ticker_is_served_without_asking_the_source(store):
+    source = store.source = StandInSource(make_bars(30))
+    store.history('AAPL')
+    store.history('AAPL')
+    assert source.requests == [None]
+
+
+def test_refresh_appends_only_new_bars(store):
+    full = make_bars(40)
+    source = store.source = StandInSource(full.iloc[:30])
+    store.history('AAPL')
+
+    source.bars = full
+    history = store.history('AAPL', refresh=True)
+    # The last stored bar is requested again, in case it was still trading
+    assert source.requests[-1] == full.index[29].date()
+    assert len(history) == 40
+    np.testing.assert_allclose(history['Close'].to_numpy(), full['Close'].to_numpy())
+
+
+def test_partial_last_bar_is_replaced(store):
+    full = make_bars(30)
+    partial = full.copy()
+    partial.iloc[-1, partial.columns.get_loc('Close')] += 5
+    store.source = StandInSource(partial)
+    store.history('AAPL')
+
+    store.source.bars = full
+    history = store.history('AAPL', refresh=True)
+    assert history['Close'].iloc[-1] == pytest.approx(full['Close'].iloc[-1])
+    assert len(history) == 30
+
+
+def test_adjusted_history_is_rebuilt(store):
+    full = make_bars(40)
+    source = store.source = StandInSource(full.iloc[:30])
+    store.history('AAPL')
+
+    # A 2:1 split re-adjusts every past price, including the last stored bar's open
+    adjusted = full.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] /= 2
+    source.bars = adjusted
+    history = store.history('AAPL', refresh=True)
+    assert source.requests[-1] is None
+    np.testing.assert_allclose(history['Close'].to_numpy(), adjusted['Close'].to_numpy())
+
+
+def test_no_new_bars_keeps_the_stored_history(store):
+    source = store.source = StandInSource(make_bars(30))
+    first = store.history('AAPL')
+    again = store.history('AAPL', refresh=True)
+    assert source.requests[-1] is not None
+    pd.testing.assert_frame_equal(first, again, check_freq=False)
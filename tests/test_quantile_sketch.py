@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from quantile_sketch import QuantileSketch, box_stats
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+# Largest difference between the fraction of values below each estimate and the quantile asked for
+def rank_error(sketch, values):
+    values = np.sort(values)
+    estimates = sketch.quantile(QS)
+    return np.abs(np.searchsorted(values, estimates, side='right') / len(values) - QS).max()
+
+
+def test_small_streams_are_exact():
+    values = np.random.default_rng(0).normal(size=150)
+    sketch = QuantileSketch(k=200).update(values)
+    np.testing.assert_allclose(sketch.quantile(QS), np.quantile(values, QS))
+    assert (sketch.n, sketch.min, sketch.max) == (150, values.min(), values.max())
+
+
+def test_missing_values_are_ignored():
+    sketch = QuantileSketch().update([1.0, np.nan, 3.0])
+    assert sketch.n == 2
+    assert sketch.quantile(0.5) == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_rank_error_is_bounded(seed):
+    values = np.random.default_rng(seed).lognormal(size=100_000)
+    sketch = QuantileSketch(k=200, seed=seed)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    assert len(sketch.items()[0]) < 1000
+    assert rank_error(sketch, values) < 2 * 1.7 / 200
+
+
+def test_merged_sketch_summarises_the_union():
+    rng = np.random.default_rng(1)
+    parts = [rng.exponential(scale, size=20_000) for scale in (1, 2, 5, 10)]
+    merged = QuantileSketch(k=200)
+    for part in parts:
+        merged = merged.merge(QuantileSketch(k=200).update(part))
+    values = np.concatenate(parts)
+    assert (merged.n, merged.min, merged.max) == (len(values), values.min(), values.max())
+    assert merged.items()[1].sum() == len(values)
+    assert rank_error(merged, values) < 2 * 1.7 / 200
+
+
+def test_box_stats_of_an_exact_sketch():
+    values = np.array([1.0, 2, 3, 4, 5, 6, 7, 8, 100])
+    stats, outliers = box_stats(QuantileSketch().update(values))
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    assert stats == dict(count=9, lower=1.0, q1=q1, median=median, q3=q3, upper=8.0)
+    assert outliers.tolist() == [100.0]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollup_store import RollupStore
+
+
+def make_samples(count, seed=0, start='2024-01-30 22:00'):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.uniform(0, 4 * 24 * 3600, count)), unit='s')
+    return pd.DataFrame({'TS': times, 'RAW_VALUE': rng.normal(50, 10, count)})
+
+
+def expected(samples, freq):
+    series = samples.set_index('TS')['RAW_VALUE']
+    grouped = series.groupby(series.index.floor(freq))
+    return pd.DataFrame({'sum': grouped.sum(), 'count': grouped.count().astype('float64'),
+                         'min': grouped.min(), 'max': grouped.max()})
+
+
+def assert_rollup_equal(rollup, samples, freq):
+    want = expected(samples, freq)
+    assert rollup.index.equals(want.index.rename('TS'))
+    for column in ('sum', 'count', 'min', 'max'):
+        np.testing.assert_allclose(rollup[column].to_numpy(), want[column].to_numpy())
+    np.testing.assert_allclose(rollup['mean'].to_numpy(), (want['sum'] / want['count']).to_numpy())
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RollupStore(str(tmp_path / 'rollups'))
+
+
+@pytest.mark.parametrize('resolution, freq', [('minute', 'min'), ('hour', 'h'), ('day', 'D')])
+def test_appended_batches_roll_up_like_a_resample(store, resolution, freq):
+    samples = make_samples(5000)
+    # Batches split across the month boundary and share buckets with each other
+    for bounds in np.array_split(np.arange(len(samples)), 7):
+        store.append(samples.iloc[bounds])
+    assert_rollup_equal(store.query(resolution), samples, freq)
+
+
+def test_query_reads_only_the_requested_range(store):
+    samples = make_samples(3000)
+    store.append(samples)
+    start, end = pd.Timestamp('2024-01-31 12:00'), pd.Timestamp('2024-02-02')
+    inside = samples[(samples['TS'] >= start) & (samples['TS'] < end)]
+    assert_rollup_equal(store.query('hour', start, end), inside, 'h')
+    assert len(store.raw(start, end)) == len(inside)
+    assert store.query('day', '2025-01-01').empty
+
+
+def test_ingest_is_idempotent(store, tmp_path):
+    samples = make_samples(2000)
+    source = tmp_path / 'samples.csv'
+    samples.to_csv(source, index=False)
+    assert store.ingest(str(source))
+    assert not store.ingest(str(source))
+    assert_rollup_equal(store.query('day'), samples, 'D')
+    assert len(store.raw()) == len(samples)
+
+
+def test_retried_ingest_counts_each_sample_once(store, tmp_path, monkeypatch):
+    samples = make_samples(2000)
+    source = tmp_path / 'samples.csv'
+    samples.to_csv(source, index=False)
+
+    # Fail after the minute rollup has been written, before the hour and day rollups
+    merge = store._merge
+
+    def failing_merge(resolution, update, part):
+        if resolution == 'hour':
+            raise OSError('disk full')
+        merge(resolution, update, part)
+
+    monkeypatch.setattr(store, '_merge', failing_merge)
+    with pytest.raises(OSError):
+        store.ingest(str(source))
+    monkeypatch.setattr(store, '_merge', merge)
+
+    assert store.ingest(str(source))
+    for resolution, freq in [('minute', 'min'), ('hour', 'h'), ('day', 'D')]:
+        assert_rollup_equal(store.query(resolution), samples, freq)
+    assert len(store.raw()) == len(samples)
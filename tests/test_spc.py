@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spc import SPCEngine, _MaterialState
+
+
+def batches(values, material='M1', start='2024-01-01', targets=None):
+    times = pd.date_range(start, periods=len(values), freq='h')
+    return pd.DataFrame({
+        'MATERIAL': material, 'END TIME': times, 'CYCLE TIME': values,
+        'TARGET CYCLE TIME': np.nan if targets is None else targets,
+        'END BATCH CODE': [f'{material}-{i}' for i in range(len(values))],
+    })
+
+
+@pytest.mark.parametrize('window', [1, 2, 10, 100])
+def test_window_statistics_match_numpy(window):
+    values = np.random.default_rng(0).lognormal(3, 1, 1000)
+    state = _MaterialState(window)
+    for i, x in enumerate(values, 1):
+        state.push(x)
+        last = values[max(0, i - window):i]
+        assert state.n == len(last)
+        assert state.mean == pytest.approx(last.mean(), rel=1e-9)
+        if len(last) > 1:
+            assert state.std == pytest.approx(last.std(ddof=1), rel=1e-6)
+        else:
+            assert math.isnan(state.std)
+
+
+def test_summary_uses_the_last_window_of_batches():
+    values = np.random.default_rng(1).normal(10, 2, 500)
+    targets = np.full(500, 12.0)
+    engine = SPCEngine(window=100).add(batches(values, targets=targets))
+    row = engine.summary().iloc[0]
+    assert row['Batches'] == 500
+    assert row['Mean'] == pytest.approx(values[-100:].mean())
+    assert row['Std'] == pytest.approx(values[-100:].std(ddof=1))
+    assert row['UCL'] == pytest.approx(row['Mean'] + 3 * row['Std'])
+    assert row['Target breach rate'] == pytest.approx((values > 12).mean())
+
+
+def test_out_of_order_batches_are_rejected():
+    engine = SPCEngine().add(batches([1.0, 2.0], start='2024-01-02'))
+    with pytest.raises(ValueError):
+        engine.add(batches([3.0], start='2024-01-01'))
+
+
+def test_a_spike_is_beyond_the_limits():
+    values = 10 + np.random.default_rng(2).normal(0, 0.1, 40)
+    values[30] = 20
+    flags = SPCEngine(warmup=20).add(batches(values)).flags()
+    spike = flags[flags['END BATCH CODE'] == 'M1-30']
+    assert spike['RULE'].str.contains('Beyond control limits').all() and len(spike) == 1
+
+
+def test_rules_wait_for_the_warmup():
+    # A steady rise from the first batch: no trend is flagged until `warmup` batches are in
+    flags = SPCEngine(warmup=20, trend_length=6).add(batches(np.arange(30.0))).flags()
+    assert flags['END BATCH CODE'].iloc[0] == 'M1-20'
+    assert flags['RULE'].str.contains('Steady rise or fall').all()
+
+
+def test_materials_are_tracked_separately():
+    engine = SPCEngine()
+    engine.add(pd.concat([batches([1.0, 2.0, 3.0], 'A'), batches([10.0, 20.0], 'B')]))
+    summary = engine.summary().set_index('MATERIAL')
+    assert summary['Batches'].to_dict() == {'A': 3, 'B': 2}
+    assert summary['Mean'].to_dict() == {'A': 2.0, 'B': 15.0}
+    assert engine.flags('B').empty
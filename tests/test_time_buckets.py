@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_buckets import key_label, period_keys, period_labels
+
+# Every day across several year boundaries, including 53-week ISO years (2015, 2020) and pre-epoch dates
+DAYS = pd.Series(pd.date_range('1968-12-20', '1970-01-10').append(pd.date_range('2014-12-20', '2027-01-10'))
+                 + pd.Timedelta(hours=13, minutes=7))
+
+
+def test_week_keys_match_the_iso_calendar():
+    iso = DAYS.dt.isocalendar()
+    expected = iso['year'].astype('int64') * 100 + iso['week'].astype('int64')
+    np.testing.assert_array_equal(period_keys(DAYS, 'week'), expected.to_numpy())
+
+
+def test_month_and_quarter_keys():
+    np.testing.assert_array_equal(period_keys(DAYS, 'month'), (DAYS.dt.year * 100 + DAYS.dt.month).to_numpy())
+    np.testing.assert_array_equal(period_keys(DAYS, 'quarter'), (DAYS.dt.year * 10 + DAYS.dt.quarter).to_numpy())
+
+
+@pytest.mark.parametrize('level', ['week', 'month', 'quarter'])
+def test_keys_sort_in_time_order_and_missing_times_are_minus_one(level):
+    keys = period_keys(DAYS, level)
+    assert np.all(np.diff(keys) >= 0)
+    assert period_keys(pd.Series([pd.NaT, DAYS[0]]), level)[0] == -1
+
+
+def test_labels():
+    assert key_label(202242, 'week') == '2022-W42'
+    assert key_label(202201, 'week') == '2022-W01'
+    assert key_label(202210, 'month') == '2022-10'
+    assert key_label(20224, 'quarter') == '2022Q4'
+
+
+def test_period_labels_are_an_ordered_categorical():
+    times = pd.Series(pd.to_datetime(['2023-01-01', None, '2022-01-03', '2023-01-01']), index=[5, 6, 7, 8], name='END')
+    labels = period_labels(times, 'week')
+    assert labels.index.equals(times.index) and labels.name == 'END'
+    assert labels.cat.ordered
+    assert list(labels.cat.categories) == ['2022-W01', '2022-W52']
+    assert labels.isna().tolist() == [False, True, False, False]
+    assert labels.tolist()[::2] == ['2022-W52', '2022-W01']
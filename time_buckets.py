@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+LEVELS = ('week', 'month', 'quarter')
+
+# 1970-01-01 was a Thursday, weekday 3 counting from Monday
+_EPOCH_WEEKDAY = 3
+
+
+def _days(times):
+    return np.asarray(times, dtype='datetime64[D]').astype('int64')
+
+
+def _years(days):
+    return np.asarray(days, dtype='datetime64[D]').astype('datetime64[Y]').astype('int64') + 1970
+
+
+# ISO 8601 weeks run Monday to Sunday and belong to the year their Thursday falls in
+def _iso_week_keys(days):
+    thursdays = days - (days + _EPOCH_WEEKDAY) % 7 + 3
+    years = _years(thursdays)
+    new_years = (np.asarray(years - 1970, dtype='datetime64[Y]').astype('datetime64[D]').astype('int64'))
+    return years * 100 + (thursdays - new_years) // 7 + 1
+
+
+def period_keys(times, level):
+    """Integer period keys for datetimes, computed with datetime64 arithmetic.
+
+    Weeks are ISO weeks as YYYYWW (202242), months YYYYMM (202210) and
+    quarters YYYYQ (20224); keys sort in time order. NaT maps to -1.
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    missing = np.isnat(times)
+    days = _days(np.where(missing, np.datetime64(0, 'ns'), times))
+    if level == 'week':
+        keys = _iso_week_keys(days)
+    else:
+        months = np.asarray(days, dtype='datetime64[D]').astype('datetime64[M]').astype('int64')
+        years, month = months // 12 + 1970, months % 12 + 1
+        keys = years * 100 + month if level == 'month' else years * 10 + (month - 1) // 3 + 1
+    return np.where(missing, -1, keys)
+
+
+def key_label(key, level):
+    if level == 'week':
+        return f'{key // 100}-W{key % 100:02d}'
+    if level == 'month':
+        return f'{key // 100}-{key % 100:02d}'
+    return f'{key // 10}Q{key % 10}'
+
+
+# Ordered categorical of labels for integer keys; only the distinct keys are formatted
+def key_labels(keys, level):
+    keys = np.asarray(keys)
+    unique, codes = np.unique(keys, return_inverse=True)
+    valid = unique >= 0
+    categories = [key_label(int(key), level) for key in unique[valid]]
+    # Shift codes past any missing key (-1 sorts first) and mark those rows as missing
+    codes = codes.reshape(-1) - (~valid).sum()
+    return pd.Categorical.from_codes(codes, categories=categories, ordered=True)
+
+
+def period_labels(times, level):
+    """ISO week ('2022-W42'), month ('2022-10') or quarter ('2022Q4') labels as an ordered categorical Series."""
+    labels = key_labels(period_keys(times, level), level)
+    return pd.Series(labels, index=getattr(times, 'index', None), name=getattr(times, 'name', None))
@@ -0,0 +1,202 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from concurrent_fetch import fetch_concurrently
+
+MARKET_TZ = 'America/New_York'
+# Shortly after the US close, when the day's final bars are available
+AFTER_CLOSE = ('16:30',)
+# Under the hour-long TTLs of the apps' caches, so a refreshed value never expires before the next refresh
+DEFAULT_EVERY = 45 * 60
+
+
+# Set on the scheduler thread during a job's first run
+_startup = threading.local()
+
+# Published generation of each refreshed (cached function, arguments) pair. The apps pass it to the cached
+# function as its last argument, so a refresh computes a new cache entry next to the one sessions are reading.
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def _generation_key(function, args):
+    # Cached functions are redefined on every rerun; their file and name identify them across reruns
+    source = getattr(function, '__wrapped__', function).__code__.co_filename
+    return source, function.__qualname__, tuple(args)
+
+
+def generation(function, *args):
+    with _generations_lock:
+        return _generations.get(_generation_key(function, args), 0)
+
+
+# The latest published value of a Streamlit-cached `function(*args, generation)`
+def latest(function, *args):
+    return function(*args, generation(function, *args))
+
+
+def refresh_cached(function, calls, max_concurrency=4):
+    """Recompute a Streamlit-cached `function(*args, generation)` for each tuple of arguments in `calls`.
+
+    The new value is computed under the next generation while sessions keep
+    reading the current one, and is published only once it is in the cache,
+    so no session misses the cache during a refresh and a failed recompute
+    leaves the previous value in place. On a job's first run the current
+    generation is only filled in: a value a session has just loaded is
+    already fresh.
+    """
+    step = 0 if getattr(_startup, 'active', False) else 1
+
+    def refresh(args):
+        next_generation = generation(function, *args) + step
+        function(*args, next_generation)
+        return next_generation
+
+    errors = []
+    for args, next_generation, error in fetch_concurrently([tuple(args) for args in calls], refresh, max_concurrency):
+        if error is not None:
+            errors.append(error)
+            continue
+        with _generations_lock:
+            _generations[_generation_key(function, args)] = next_generation
+    if errors:
+        raise errors[0]
+
+
+# Next weekday occurrence of any HH:MM in `times` (market time zone) after `after`, as epoch seconds
+def _next_daily(times, after, tz=MARKET_TZ):
+    now = pd.Timestamp(after, unit='s', tz='UTC').tz_convert(tz)
+    candidates = []
+    for days in range(8):
+        day = (now + timedelta(days=days)).normalize()
+        if day.weekday() >= 5:
+            continue
+        for clock in times:
+            hour, minute = map(int, clock.split(':'))
+            at = day.replace(hour=hour, minute=minute)
+            if at > now:
+                candidates.append(at.timestamp())
+    return min(candidates) if candidates else None
+
+
+class Job:
+    def __init__(self, name, refresh, every=DEFAULT_EVERY, at=AFTER_CLOSE):
+        self.name = name
+        self.refresh = refresh
+        self.every = every
+        self.at = at
+        self.runs = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_success = None
+        self.last_duration = None
+        self.last_error = None
+        self.running = False
+
+    def next_due(self):
+        if self.last_started is None:
+            return 0.0
+        due = [self.last_started + self.every] if self.every else []
+        daily = _next_daily(self.at, self.last_started) if self.at else None
+        if daily is not None:
+            due.append(daily)
+        return min(due) if due else None
+
+
+class WatchlistScheduler:
+    """Refreshes registered watchlists and reference lists on a background thread.
+
+    A job runs as soon as it is registered (the first time its app is
+    loaded in this server process), then every `every` seconds and at the
+    `at` times on weekdays, e.g. after the market close. Sessions read the
+    caches the jobs keep warm. `metrics()` reports each job's last refresh
+    duration and how stale its data is.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, name, refresh, every=DEFAULT_EVERY, at=AFTER_CLOSE):
+        """Add a job, or update the refresh function of an existing one without running it again."""
+        with self._lock:
+            job = self.jobs.get(name)
+            if job is None:
+                self.jobs[name] = job = Job(name, refresh, every, at)
+            else:
+                job.refresh, job.every, job.at = refresh, every, at
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='watchlist-scheduler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return job
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            with self._lock:
+                schedule = [(job.next_due(), job) for job in self.jobs.values()]
+            schedule = [(due_at, job) for due_at, job in schedule if due_at is not None]
+            due = [job for due_at, job in schedule if due_at <= time.time()]
+            for job in due:
+                self._refresh(job)
+            if not due:
+                # Sleep until the next job is due, or until a new job is registered
+                self._wake.wait(max(min(due_at for due_at, _ in schedule) - time.time(), 0.0) if schedule else None)
+
+    def _refresh(self, job):
+        job.running = True
+        _startup.active = job.runs == 0
+        job.last_started = time.time()
+        try:
+            job.refresh()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f'{type(e).__name__}: {e}'
+        else:
+            job.last_success = time.time()
+            job.last_error = None
+        finally:
+            job.runs += 1
+            job.last_duration = time.time() - job.last_started
+            job.running = False
+            _startup.active = False
+
+    def metrics(self, names=None):
+        """Per job: refresh count, failures, last refresh duration, staleness and next scheduled run."""
+        now = time.time()
+        with self._lock:
+            jobs = [job for name, job in self.jobs.items() if names is None or name in names]
+        rows = []
+        for job in jobs:
+            next_due = job.next_due()
+            rows.append({
+                'job': job.name,
+                'runs': job.runs,
+                'failures': job.failures,
+                'refresh_s': job.last_duration,
+                'stale_s': now - job.last_success if job.last_success is not None else None,
+                'next_run': datetime.fromtimestamp(next_due) if next_due else None,
+                'running': job.running,
+                'error': job.last_error,
+            })
+        return pd.DataFrame(rows, columns=['job', 'runs', 'failures', 'refresh_s', 'stale_s', 'next_run',
+                                           'running', 'error'])
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler shared by every app and session in this server."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = WatchlistScheduler()
+        return _scheduler